@@ -3,7 +3,9 @@ import cv2
 import numpy as np
 import os
 
-image_path = "/Users/cnowlin/.cursor/projects/Users-cnowlin-Developer-Musically-Nowlin-Games/assets/Gemini_Generated_Image_kxjrvnkxjrvnkxjr-ea89c400-b3c3-4bd2-9f21-9a914455af89.png"
+from sprite_slicer import sheet_arg
+
+image_path = sheet_arg("/Users/cnowlin/.cursor/projects/Users-cnowlin-Developer-Musically-Nowlin-Games/assets/Gemini_Generated_Image_kxjrvnkxjrvnkxjr-ea89c400-b3c3-4bd2-9f21-9a914455af89.png")
 
 # Load image
 img = cv2.imread(image_path)
@@ -0,0 +1,216 @@
+"""Content-addressed incremental cache for the asset pipeline scripts.
+
+The cache is a single JSON index on disk holding two tables:
+
+* ``files``: absolute path -> ``(size, mtime_ns, sha256)``.  A file is only
+  re-hashed when its size or mtime changes, so checking an unchanged tree
+  costs one ``stat`` per file.
+* ``tasks``: task key -> ``{output path: sha256}``.  A task key is the hash
+  of its source file digests plus its parameters; a task is fresh while every
+  recorded output still exists with the recorded digest.
+
+Usage::
+
+    with AssetCache() as cache:
+        key = cache.key(sheet_path, min_area=500)
+        if not cache.fresh(key):
+            outputs = slice(...)
+            cache.record(key, outputs)
+        cache.copy(src, dst)   # no-op when dst already holds src's bytes
+        cache.copy(src, dst, mode="auto")   # reflink/hardlink instead of copying
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+DEFAULT_INDEX = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", ".asset-cache.json")
+CHUNK = 1 << 20
+
+# How deploys place bytes at their destination:
+#   copy     - shutil.copy2, always independent bytes
+#   reflink  - copy-on-write clone (btrfs/XFS FICLONE, APFS clonefile)
+#   hardlink - another name for the source inode; editing one edits both
+#   auto     - reflink, else hardlink, else copy
+LINK_MODES = ("copy", "reflink", "hardlink", "auto")
+FICLONE = 0x40049409
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def reflink(src, dst):
+    """Clone ``src`` to ``dst`` sharing extents; raises OSError if unsupported."""
+    if sys.platform == "darwin":
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dst)
+        return
+    import fcntl
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        try:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        except OSError:
+            fd.close()
+            os.unlink(dst)
+            raise
+
+
+def atomic_write(path, writer):
+    """Have ``writer(tmp)`` write a temp file beside ``path``, then rename it over ``path``.
+
+    ``path`` is replaced, never written through, so a hardlinked deploy of
+    the old file keeps its bytes and readers never see a partial file.  The
+    temp file is removed if ``writer`` fails.  Returns ``writer``'s result.
+    """
+    tmp = f"{path}.tmp{os.getpid()}"
+    if os.path.lexists(tmp):
+        os.unlink(tmp)
+    try:
+        result = writer(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        raise
+    return result
+
+
+def write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def write_json(path, data, **dump_args):
+    """``json.dump`` ``data`` to ``path`` through ``atomic_write``, newline-terminated."""
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(data, f, **dump_args)
+            f.write("\n")
+    atomic_write(path, write)
+
+
+def place_file(src, dst, mode="copy"):
+    """Put ``src``'s bytes at ``dst`` using ``mode`` (see LINK_MODES).
+
+    The new file is placed through ``atomic_write``, so an existing ``dst``
+    is replaced atomically and never written through (which would corrupt a
+    hardlinked source).  Returns the mode actually used.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode {mode!r}")
+    attempts = ["reflink", "hardlink", "copy"] if mode == "auto" else [mode]
+
+    def place(tmp):
+        for attempt in attempts:
+            try:
+                if attempt == "reflink":
+                    reflink(src, tmp)
+                elif attempt == "hardlink":
+                    os.link(src, tmp)
+                else:
+                    shutil.copy2(src, tmp)
+            except OSError as e:
+                if mode != "auto" or e.errno not in (
+                        errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL,
+                        errno.EPERM, errno.ENOTSUP, errno.EMLINK):
+                    raise
+                continue
+            return attempt
+        raise OSError(f"Could not place {src} at {dst}")
+
+    return atomic_write(dst, place)
+
+
+class AssetCache:
+    def __init__(self, index_path=DEFAULT_INDEX):
+        self.index_path = os.path.normpath(index_path)
+        self.files = {}
+        self.tasks = {}
+        self.dirty = False
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.tasks = data.get("tasks", {})
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+    def digest(self, path):
+        """sha256 of ``path``, or None if it does not exist."""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.files.pop(path, None)
+            return None
+        entry = self.files.get(path)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        digest = sha256_file(path)
+        self.files[path] = [st.st_size, st.st_mtime_ns, digest]
+        self.dirty = True
+        return digest
+
+    def key(self, *sources, **params):
+        """Task key from the bytes of ``sources`` plus JSON-able ``params``."""
+        h = hashlib.sha256()
+        for src in sources:
+            digest = self.digest(src)
+            if digest is None:
+                raise FileNotFoundError(src)
+            h.update(digest.encode())
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def fresh(self, key):
+        outputs = self.tasks.get(key)
+        if outputs is None:
+            return False
+        return all(self.digest(p) == d for p, d in outputs.items())
+
+    def outputs(self, key):
+        return list(self.tasks.get(key, {}))
+
+    def record(self, key, outputs):
+        self.tasks[key] = {os.path.abspath(p): self.digest(p) for p in outputs}
+        self.dirty = True
+
+    def copy(self, src, dst, mode="copy"):
+        """Place ``src`` at ``dst`` unless ``dst`` already has identical bytes.
+
+        ``mode`` picks copy, reflink or hardlink (see LINK_MODES).  Returns
+        True when ``dst`` was replaced.
+        """
+        digest = self.digest(src)
+        if digest is None:
+            raise FileNotFoundError(src)
+        if self.digest(dst) == digest:
+            return False
+        place_file(src, dst, mode)
+        self.digest(dst)
+        return True
+
+    def save(self):
+        if not self.dirty:
+            return
+        write_json(self.index_path, {"files": self.files, "tasks": self.tasks})
+        self.dirty = False
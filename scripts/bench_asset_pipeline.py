@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Benchmark the Python asset pipeline on synthetic sprite sheets.
+
+Synthetic sheets of growing size are generated in memory (a flat
+background with N filled shapes laid out in rows), then each pipeline stage
+is timed on them:
+
+    mask      sprite_slicer.background_mask
+    matte     sprite_slicer.soft_matte (on a copy; it decontaminates in place)
+    boxes     sprite_slicer.component_boxes
+    rows      sprite_slicer.group_rows
+    crops     sprite_slicer.write_crops (PNG encode + write to a temp dir)
+    sprites   pixel_sprites.rasterize + render for every file in scripts/sprites
+    sprites-indexed
+              the same with render_indexed (the palette path the game ships)
+
+Results are written as JSON so runs can be diffed across commits; with
+``--compare`` the run is checked against an earlier result file and exits
+non-zero if any stage got slower than ``--threshold``.
+
+Usage:
+    python3 scripts/bench_asset_pipeline.py --out bench-before.json
+    python3 scripts/bench_asset_pipeline.py --compare bench-before.json
+    python3 scripts/bench_asset_pipeline.py --sizes 1024 --items 10,100 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from pixel_sprites import load_sprite, rasterize, render, render_indexed, sprite_paths
+from sprite_slicer import (Sheet, background_mask, component_boxes, group_rows, soft_matte,
+                           write_crops)
+
+SIZES = (1024, 4096, 8192)
+ITEMS = (10, 100, 500)
+SPRITE_SCALES = (1, 4, 8, 32)
+BG_COLOR = (80, 81, 76)
+
+
+def synthetic_sheet(size, items, seed=0):
+    """A size×size BGR sheet with ``items`` shapes in a near-square grid."""
+    rng = np.random.default_rng(seed)
+    img = np.empty((size, size, 3), dtype=np.uint8)
+    img[:] = BG_COLOR
+    cols = int(np.ceil(np.sqrt(items)))
+    cell = size // cols
+    for i in range(items):
+        r, c = divmod(i, cols)
+        cx, cy = c * cell + cell // 2, r * cell + cell // 2
+        ax, ay = (rng.uniform(0.2, 0.4, 2) * cell).astype(int) + 1
+        color = tuple(int(v) for v in rng.integers(140, 256, 3))
+        if i % 2:
+            cv2.ellipse(img, (cx, cy), (int(ax), int(ay)), 0, 0, 360, color, -1)
+        else:
+            cv2.rectangle(img, (cx - ax, cy - ay), (cx + ax, cy + ay), color, -1)
+    return img
+
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, {"min": min(times), "median": statistics.median(times)}
+
+
+def bench_sheet(size, items, repeat, tmp_dir):
+    img = synthetic_sheet(size, items)
+    results = []
+
+    alpha, t = timed(lambda: background_mask(img), repeat)
+    results.append(("mask", t))
+
+    _, t = timed(lambda: soft_matte(img.copy()), repeat)
+    results.append(("matte", t))
+
+    boxes, t = timed(lambda: component_boxes(alpha), repeat)
+    results.append(("boxes", t))
+
+    rows, t = timed(lambda: group_rows(boxes), repeat)
+    results.append(("rows", t))
+
+    rgba = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    rgba[:, :, 3] = alpha
+    sheet = Sheet("synthetic", rgba, rgba[:, :, 3], boxes)
+    crops = [(box, f"crop_{i:04d}.png") for i, box in enumerate(boxes)]
+    _, t = timed(lambda: write_crops(sheet, crops, tmp_dir), repeat)
+    results.append(("crops", t))
+
+    return [{"stage": stage, "size": size, "items": items,
+             "found": len(boxes), **t} for stage, t in results]
+
+
+def bench_sprites(repeat):
+    specs = [load_sprite(p) for p in sprite_paths()]
+    results = []
+    for stage, draw in (("sprites", render), ("sprites-indexed", render_indexed)):
+        def run():
+            for spec in specs:
+                grid, palette = rasterize(spec)
+                for scale in SPRITE_SCALES:
+                    draw(grid, palette, scale)
+
+        _, t = timed(run, repeat)
+        results.append({"stage": stage, "size": None, "items": len(specs), "found": None, **t})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(r):
+    return f"{r['stage']}/{r['size']}/{r['items']}"
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    regressions = 0
+    for r in results:
+        old = baseline.get(result_key(r))
+        if old is None:
+            continue
+        ratio = r["min"] / old["min"] if old["min"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- regression"
+            regressions += 1
+        print(f"{result_key(r):24s} {old['min'] * 1000:10.2f}ms -> "
+              f"{r['min'] * 1000:10.2f}ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def parse_ints(value):
+    return tuple(int(v) for v in value.split(",") if v.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=parse_ints, default=SIZES,
+                        help="comma-separated sheet edge lengths in pixels")
+    parser.add_argument("--items", type=parse_ints, default=ITEMS,
+                        help="comma-separated shape counts per sheet")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    parser.add_argument("--out", default="asset-pipeline-bench.json",
+                        help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown before a stage counts as a regression")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            for items in args.items:
+                for r in bench_sheet(size, items, args.repeat, tmp_dir):
+                    print(f"{result_key(r):24s} {r['min'] * 1000:10.2f}ms "
+                          f"({r['found']} boxes)")
+                    results.append(r)
+    for r in bench_sprites(args.repeat):
+        print(f"{result_key(r):24s} {r['min'] * 1000:10.2f}ms")
+        results.append(r)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {args.out}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
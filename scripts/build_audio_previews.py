@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Build a bundle of short raw-PCM sample heads for instant first-note playback.
+
+Decoding a whole MP3 on first tap is slow on low-end Chromebooks.  This
+script decodes the first ``--seconds`` of each sample (from its onset, when
+trim_philharmonia.py has recorded one) on a process pool.  Heads are
+written in path order as soon as every earlier one is in, so the same
+inputs always give the same bytes.  They are written mono at ``--rate`` as
+headerless little-endian PCM, end to end:
+
+    client/public/audio/previews.pcm     int16 (or int8 with --bits 8)
+    client/public/audio/previews.json
+
+    {"file": "/audio/previews.pcm", "sampleRate": 16000, "bits": 16,
+     "previews": {"philharmonia/strings/violin/violin_C5_05_forte_arco-normal.mp3":
+                  [offset, length], ...}}
+
+Offsets and lengths count samples, not bytes, so the client can wrap the
+fetched buffer in one typed array (or fetch a byte range) and play a head
+at once while the real sample loads.  The same bundle can be opened here
+with ``open_previews``, which memory-maps it.
+
+By default only the samples listed in the instrument library are included;
+``--all`` covers the whole corpus manifest.
+
+Usage:
+    python3 scripts/build_audio_previews.py
+    python3 scripts/build_audio_previews.py --all --bits 8 --seconds 0.15
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from asset_cache import atomic_write, write_json
+from corpus_scan import scan
+from pack_audio_sprites import PUBLIC_AUDIO, library_samples
+from philharmonia import MANIFEST_PATH, decode_audio, load_manifest
+
+OUT_PATH = os.path.join(PUBLIC_AUDIO, "previews.pcm")
+URL_ROOT = "/audio"
+PREVIEW_SECONDS = 0.25
+PREVIEW_RATE = 16000
+DTYPES = {8: np.dtype("i1"), 16: np.dtype("<i2")}
+
+
+def corpus_onsets(manifest_path=MANIFEST_PATH):
+    """``/audio``-relative path -> onset seconds for every manifest sample (0 if unknown)."""
+    try:
+        manifest = load_manifest(manifest_path)
+    except FileNotFoundError:
+        return {}
+    fields = manifest["fields"]
+    root = manifest["root"].removeprefix(URL_ROOT + "/")
+    path_col = fields.index("path")
+    onset_col = fields.index("onset") if "onset" in fields else None
+    onsets = {}
+    for row in manifest["samples"]:
+        onset = row[onset_col] if onset_col is not None else None
+        onsets[f"{root}/{row[path_col]}"] = onset or 0.0
+    return onsets
+
+
+def preview_head(path, onset, seconds, rate, bits):
+    """Decode ``seconds`` of ``path`` from ``onset`` and quantize to ``bits``."""
+    samples = decode_audio(path, sample_rate=rate, seconds=onset + seconds)
+    samples = samples[int(onset * rate):]
+    scale = 2 ** (bits - 1) - 1
+    return np.clip(np.round(samples * scale), -scale, scale).astype(DTYPES[bits])
+
+
+def open_previews(index_path):
+    """``(memmap of every head, {path: (offset, length)})`` for a built bundle."""
+    with open(index_path) as f:
+        index = json.load(f)
+    data_path = os.path.join(os.path.dirname(index_path), os.path.basename(index["file"]))
+    data = np.memmap(data_path, dtype=DTYPES[index["bits"]], mode="r")
+    return data, {p: tuple(v) for p, v in index["previews"].items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=OUT_PATH, help="bundle path (.pcm)")
+    parser.add_argument("--all", action="store_true",
+                        help="every manifest sample instead of the library samples")
+    parser.add_argument("--seconds", type=float, default=PREVIEW_SECONDS)
+    parser.add_argument("--rate", type=int, default=PREVIEW_RATE)
+    parser.add_argument("--bits", type=int, choices=sorted(DTYPES), default=16)
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    onsets = corpus_onsets()
+    if args.all:
+        if not onsets:
+            parser.error(f"no manifest at {MANIFEST_PATH}; run index_philharmonia.py")
+        paths = sorted(onsets)
+    else:
+        paths = sorted({p for ps in library_samples().values() for p in ps})
+    files = [os.path.join(PUBLIC_AUDIO, *p.split("/")) for p in paths]
+    position = {f: i for i, f in enumerate(files)}
+    n = len(paths)
+
+    previews = {}
+    items = [(f, onsets.get(p, 0.0)) for p, f in zip(paths, files)]
+
+    def write_heads(tmp):
+        offset = failed = 0
+        ready = {}          # heads that finished ahead of an earlier path (None: failed)
+        next_index = 0
+        with open(tmp, "wb") as out:
+            for (file, _), head, error in scan(preview_head, items, args.seconds, args.rate,
+                                               args.bits, jobs=args.jobs):
+                if error is not None:
+                    failed += 1
+                    print(f"Error: {error}")
+                ready[position[file]] = head
+                while next_index in ready:
+                    head = ready.pop(next_index)
+                    if head is not None:
+                        out.write(head.tobytes())
+                        previews[paths[next_index]] = [offset, len(head)]
+                        offset += len(head)
+                    next_index += 1
+        return offset, failed
+
+    offset, failed = atomic_write(args.out, write_heads)
+    write_json(os.path.splitext(args.out)[0] + ".json",
+               {"file": f"{URL_ROOT}/{os.path.basename(args.out)}",
+                "sampleRate": args.rate, "bits": args.bits, "previews": previews},
+               separators=(",", ":"))
+    size = offset * DTYPES[args.bits].itemsize
+    print(f"{len(previews)}/{n} previews, {size / 1e6:.2f} MB -> {args.out}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
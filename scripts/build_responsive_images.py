@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Build a WebP + AVIF srcset ladder for every image asset.
+
+Every PNG/JPEG under the given inputs (default client/public/images) and,
+with ``--crops``, every crop recorded in the slicer's crop manifests is
+resized to each ladder width below its own width (plus its own width,
+capped at the top of the ladder) and encoded as WebP and AVIF.  Files are
+processed in parallel on a process pool (corpus_scan.scan); unchanged
+sources are skipped via the asset cache.
+
+Variants land under ``--out`` (default client/public/images/responsive),
+mirroring the source path:
+
+    responsive/images/bass-drum-320w.webp
+    responsive/images/bass-drum-320w.avif
+
+and a manifest beside them lists every width with its byte sizes, so the
+client can build ``srcset`` or pick the smallest adequate file.  Runs over
+different inputs accumulate in one manifest; an entry is dropped only once
+its source file is gone:
+
+    {"version": 1, "images": {"/images/bass-drum.png": {
+        "width": 1024, "height": 1024,
+        "variants": [{"width": 320, "height": 320,
+                      "webp": {"url": "/images/responsive/images/bass-drum-320w.webp",
+                               "bytes": 9120},
+                      "avif": {...}}, ...]}}}
+
+A standalone WebP source is included only when no PNG/JPEG with the same
+stem sits beside it.  Hand-made size variants (``aoc_stage_floor_1920x1080.webp``)
+are skipped: the ladder of their base image replaces them.  Sources must
+live inside the repository, so every output stays under ``--out``.
+
+Usage:
+    python3 scripts/build_responsive_images.py
+    python3 scripts/build_responsive_images.py client/public/aoc --crops sliced_assets
+    python3 scripts/build_responsive_images.py --widths 480,960 --formats webp
+"""
+
+import argparse
+import json
+import os
+import re
+
+from PIL import Image
+
+from asset_cache import AssetCache, atomic_write, write_json
+from corpus_scan import scan
+from crop_manifest import all_crops, load_manifests
+from slice_sheets import expand_inputs
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PUBLIC_DIR = os.path.join(ROOT, "client", "public")
+IMAGES_DIR = os.path.join(PUBLIC_DIR, "images")
+OUT_DIR = os.path.join(IMAGES_DIR, "responsive")
+MANIFEST_NAME = "manifest.json"
+
+WIDTHS = (320, 480, 640, 960, 1280, 1920, 2560)
+FORMATS = ("webp", "avif")
+# WebP method 6 is ~7x slower than 4 for a few percent smaller files.
+ENCODE_OPTIONS = {"webp": {"quality": 80, "method": 4},
+                  "avif": {"quality": 60, "speed": 6}}
+SOURCE_EXTS = (".png", ".jpg", ".jpeg")
+SIZE_SUFFIX_RE = re.compile(r"_\d+x\d+$")
+
+
+def asset_key(path):
+    """URL for files under client/public, otherwise the repo-relative path."""
+    path = os.path.abspath(path)
+    if path.startswith(PUBLIC_DIR + os.sep):
+        return "/" + os.path.relpath(path, PUBLIC_DIR).replace(os.sep, "/")
+    return os.path.relpath(path, ROOT).replace(os.sep, "/")
+
+
+def key_path(key):
+    """Inverse of ``asset_key``."""
+    if key.startswith("/"):
+        return os.path.join(PUBLIC_DIR, *key.lstrip("/").split("/"))
+    return os.path.join(ROOT, *key.split("/"))
+
+
+def source_images(inputs, out_dir):
+    """Sources among ``inputs``: PNG/JPEG, plus WebP without a PNG/JPEG sibling.
+
+    Files named ``<stem>_<W>x<H>.<ext>`` are earlier hand-made size variants
+    and are left out.
+    """
+    out_dir = os.path.abspath(out_dir)
+    paths = [p for p in expand_inputs(inputs)
+             if not os.path.abspath(p).startswith(out_dir + os.sep)
+             and not SIZE_SUFFIX_RE.search(os.path.splitext(os.path.basename(p))[0])]
+    stems = {os.path.splitext(p)[0] for p in paths if p.lower().endswith(SOURCE_EXTS)}
+    return [p for p in paths if p.lower().endswith(SOURCE_EXTS)
+            or (p.lower().endswith(".webp") and os.path.splitext(p)[0] not in stems)]
+
+
+def ladder(width, widths=WIDTHS):
+    """Ladder widths below ``width``, plus ``width`` itself capped at the top rung."""
+    below = [w for w in widths if w < width]
+    top = min(width, max(widths))
+    return below if top in below else below + [top]
+
+
+def resize(img, width):
+    if width == img.width:
+        return img
+    height = max(1, round(img.height * width / img.width))
+    if img.mode == "RGBA":
+        # Premultiplied so transparent pixels' colour does not bleed into edges.
+        return img.convert("RGBa").resize((width, height), Image.LANCZOS).convert("RGBA")
+    return img.resize((width, height), Image.LANCZOS)
+
+
+def build_variants(src, out_stem, widths, formats):
+    """Encode ``src`` at every ladder width; returns ``(manifest entry, outputs)``."""
+    with Image.open(src) as img:
+        img.load()
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    os.makedirs(os.path.dirname(out_stem), exist_ok=True)
+    variants = []
+    outputs = []
+    for width in ladder(img.width, widths):
+        scaled = resize(img, width)
+        variant = {"width": scaled.width, "height": scaled.height}
+        for fmt in formats:
+            path = f"{out_stem}-{width}w.{fmt}"
+            atomic_write(path, lambda tmp: scaled.save(tmp, fmt.upper(), **ENCODE_OPTIONS[fmt]))
+            variant[fmt] = {"url": asset_key(path), "bytes": os.path.getsize(path)}
+            outputs.append(path)
+        variants.append(variant)
+    entry = {"width": img.width, "height": img.height, "variants": variants}
+    return entry, outputs
+
+
+def parse_list(value):
+    return tuple(v.strip() for v in value.split(",") if v.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="*", default=[IMAGES_DIR],
+                        help="image files, directories or globs")
+    parser.add_argument("--crops", action="append", default=[],
+                        help="crop manifest root from slice_sheets.py (repeatable)")
+    parser.add_argument("--out", default=OUT_DIR, help="output root directory")
+    parser.add_argument("--widths", type=lambda v: tuple(int(w) for w in parse_list(v)),
+                        default=WIDTHS, help="comma-separated ladder widths")
+    parser.add_argument("--formats", type=parse_list, default=FORMATS,
+                        help="comma-separated output formats (webp, avif)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the asset cache and re-encode every image")
+    args = parser.parse_args()
+
+    unknown = set(args.formats) - set(ENCODE_OPTIONS)
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(sorted(unknown))}")
+    paths = source_images(args.inputs, args.out)
+    for root in args.crops:
+        paths.extend(all_crops(load_manifests(root)))
+    # A key is also the output path under --out, so it must not climb out of it.
+    outside = {p for p in paths if asset_key(p).startswith("../")}
+    for p in sorted(outside):
+        print(f"Warning: skipping {p}: outside the repository")
+    paths = [p for p in paths if p not in outside]
+    if not paths:
+        parser.error("no images found")
+    keys = {p: asset_key(p) for p in paths}
+
+    manifest_path = os.path.join(args.out, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)["images"]
+    except (FileNotFoundError, ValueError, KeyError):
+        previous = {}
+
+    cache = AssetCache()
+    tasks = {p: cache.key(p, __file__, widths=args.widths, formats=args.formats,
+                          options=ENCODE_OPTIONS, out=os.path.abspath(args.out)) for p in paths}
+    images = {k: v for k, v in previous.items() if os.path.exists(key_path(k))}
+    stale = []
+    for p in paths:
+        if not args.force and keys[p] in previous and cache.fresh(tasks[p]):
+            images[keys[p]] = previous[keys[p]]
+        else:
+            stale.append(p)
+    if len(stale) < len(paths):
+        print(f"{len(paths) - len(stale)} images up to date")
+
+    failed = 0
+    items = [(p, os.path.join(args.out, os.path.splitext(keys[p].lstrip("/"))[0]))
+             for p in stale]
+    for (path, _), result, error in scan(build_variants, items, args.widths, args.formats,
+                                         jobs=args.jobs):
+        if error is not None:
+            failed += 1
+            images.pop(keys[path], None)
+            print(f"Error: {path}: {error}")
+            continue
+        entry, outputs = result
+        images[keys[path]] = entry
+        cache.record(tasks[path], outputs)
+        print(f"{keys[path]}: {len(entry['variants'])} widths")
+    cache.save()
+
+    os.makedirs(args.out, exist_ok=True)
+    write_json(manifest_path, {"version": 1, "images": dict(sorted(images.items()))}, indent=1)
+    total = {fmt: sum(v[fmt]["bytes"] for e in images.values() for v in e["variants"]
+                      if fmt in v) for fmt in args.formats}
+    sizes = ", ".join(f"{fmt} {b / 1e6:.1f} MB" for fmt, b in total.items())
+    print(f"Done: {len(paths) - failed}/{len(paths)} images; {len(images)} in manifest "
+          f"({sizes}) -> {manifest_path}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
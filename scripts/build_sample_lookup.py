@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Precompute the nearest available sample for every note of every instrument.
+
+The Philharmonia corpus is sparse: many (pitch, dynamic) combinations have
+no recording.  This script reads the manifest written by
+index_philharmonia.py and, for each pitched instrument, fills a dense
+(MIDI pitch × dynamic) table with the closest sample and the shift needed
+to play it at the requested pitch:
+
+    {
+      "version": 1,
+      "root": "/audio/philharmonia",
+      "dynamics": ["molto-pianissimo", ..., "fortissimo"],
+      "samples": ["strings/violin/violin_G3_1_forte_arco-normal.mp3", ...],
+      "instruments": {
+        "violin": {"articulation": "arco-normal", "lowMidi": 55, "highMidi": 103,
+                   "cells": [[sampleIndex, semitones, playbackRate], ...]}
+      }
+    }
+
+``cells`` is row-major: the cell for ``midi`` and dynamic ``d`` is at
+``(midi - lowMidi) * len(dynamics) + d``.  Closeness is the pitch distance
+in semitones, then the distance between dynamic levels, then a preference
+for mid-length notes.  All candidates of an instrument are scored against
+all cells in one NumPy pass.
+
+Usage:
+    python3 scripts/build_sample_lookup.py
+    python3 scripts/build_sample_lookup.py --extend 2 --out lookup.json
+"""
+
+import argparse
+import os
+from collections import Counter
+
+import numpy as np
+
+from philharmonia import (AUDIO_DIR, DYNAMICS, MANIFEST_PATH, UNPITCHED, load_manifest,
+                          note_to_midi, save_manifest)
+
+LOOKUP_PATH = os.path.join(AUDIO_DIR, "lookup.json")
+STEADY_DYNAMICS = DYNAMICS[:7]   # crescendo/decrescendo samples are never substituted
+DURATION_PREFERENCE = ["1", "05", "15", "025", "long", "very-long", "phrase", ""]
+
+# Cost weights: one semitone of pitch shift outweighs any dynamic mismatch,
+# which in turn outweighs note length.
+PITCH_WEIGHT = 100.0
+DYNAMIC_WEIGHT = 10.0
+DURATION_WEIGHT = 1.0
+
+
+def main_articulation(cells):
+    """Most common articulation whose name contains "normal", else most common."""
+    counts = Counter(art for dyns in cells.values()
+                     for arts in dyns.values() for art, ids in arts.items()
+                     for _ in ids)
+    normal = [a for a, _ in counts.most_common() if "normal" in a]
+    return normal[0] if normal else counts.most_common(1)[0][0]
+
+
+def candidates(pitches, articulation, duration_of):
+    """Arrays ``(sample ids, midi, dynamic rank, duration rank)`` for one instrument."""
+    ids, midi, dyn, dur = [], [], [], []
+    for pitch, dyns in pitches.items():
+        m = note_to_midi(pitch)
+        for dynamic, arts in dyns.items():
+            if dynamic not in STEADY_DYNAMICS:
+                continue
+            for sid in arts.get(articulation, []):
+                code = duration_of(sid)
+                ids.append(sid)
+                midi.append(m)
+                dyn.append(STEADY_DYNAMICS.index(dynamic))
+                dur.append(DURATION_PREFERENCE.index(code)
+                           if code in DURATION_PREFERENCE else len(DURATION_PREFERENCE))
+    return np.array(ids), np.array(midi), np.array(dyn), np.array(dur)
+
+
+def resolve_instrument(pitches, duration_of, extend):
+    articulation = main_articulation(pitches)
+    ids, midi, dyn, dur = candidates(pitches, articulation, duration_of)
+    if len(ids) == 0:
+        return None
+    low, high = int(midi.min()) - extend, int(midi.max()) + extend
+
+    target_midi = np.repeat(np.arange(low, high + 1), len(STEADY_DYNAMICS))
+    target_dyn = np.tile(np.arange(len(STEADY_DYNAMICS)), high - low + 1)
+    cost = (PITCH_WEIGHT * np.abs(target_midi[:, None] - midi[None, :])
+            + DYNAMIC_WEIGHT * np.abs(target_dyn[:, None] - dyn[None, :])
+            + DURATION_WEIGHT * dur[None, :])
+    best = cost.argmin(axis=1)
+    shift = target_midi - midi[best]
+    return {
+        "articulation": articulation,
+        "lowMidi": low,
+        "highMidi": high,
+        "sampleIds": ids[best],
+        "shift": shift,
+    }
+
+
+def build_lookup(manifest, extend=0):
+    fields = manifest["fields"]
+    path_col, dur_col = fields.index("path"), fields.index("duration")
+    samples = manifest["samples"]
+
+    def duration_of(sid):
+        return samples[sid][dur_col]
+
+    used = {}
+    instruments = {}
+    for name, pitches in sorted(manifest["index"].items()):
+        pitched = {p: d for p, d in pitches.items() if p != UNPITCHED}
+        if not pitched:
+            continue
+        resolved = resolve_instrument(pitched, duration_of, extend)
+        if resolved is None:
+            continue
+        cells = []
+        for sid, shift in zip(resolved["sampleIds"].tolist(), resolved["shift"].tolist()):
+            idx = used.setdefault(sid, len(used))
+            cells.append([idx, shift, round(2 ** (shift / 12), 6)])
+        instruments[name] = {
+            "articulation": resolved["articulation"],
+            "lowMidi": resolved["lowMidi"],
+            "highMidi": resolved["highMidi"],
+            "cells": cells,
+        }
+    return {
+        "version": 1,
+        "root": manifest["root"],
+        "dynamics": list(STEADY_DYNAMICS),
+        "samples": [samples[sid][path_col] for sid in used],
+        "instruments": instruments,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="corpus manifest")
+    parser.add_argument("--out", default=LOOKUP_PATH, help="lookup table path")
+    parser.add_argument("--extend", type=int, default=0,
+                        help="semitones to extend each instrument's range by")
+    args = parser.parse_args()
+
+    lookup = build_lookup(load_manifest(args.manifest), args.extend)
+    save_manifest(lookup, args.out)
+    cells = sum(len(i["cells"]) for i in lookup["instruments"].values())
+    exact = sum(1 for i in lookup["instruments"].values() for c in i["cells"] if c[1] == 0)
+    print(f"{len(lookup['instruments'])} instruments, {cells} cells "
+          f"({exact} exact pitch) from {len(lookup['samples'])} samples -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Bounded-memory, resumable scanning of large file trees on a process pool.
+
+The corpus tools all run one function per file over thousands of files.
+``scan`` does that as a generator: at most ``max_pending`` files are in
+flight, results are yielded as they complete (never collected), and with a
+``Checkpoint`` every finished file is appended to a JSON-lines log so an
+interrupted run resumes where it stopped.
+
+    with Checkpoint(checkpoint_path("trim_philharmonia"), params) as done:
+        for path, result, error in scan(trim_file, paths, threshold, checkpoint=done):
+            ...
+
+A checkpoint entry is reused only while the file's size and mtime match
+and the run's ``params`` equal the ones the log was started with; any other
+``params`` start a fresh log.  Results must be JSON-serializable.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import json
+import os
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                              ".scan-checkpoints")
+
+
+def checkpoint_path(name):
+    return os.path.normpath(os.path.join(CHECKPOINT_DIR, f"{name}.jsonl"))
+
+
+def _stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class Checkpoint:
+    def __init__(self, path, params=None):
+        self.path = path
+        self.params = json.loads(json.dumps(params, default=str))
+        self.done = {}
+        try:
+            with open(path) as f:
+                header = json.loads(f.readline() or "null")
+                if header == {"params": self.params}:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break   # torn last line from an interrupted run
+                        self.done[entry["path"]] = (entry["stat"], entry["result"])
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.done:
+            self.log = open(path, "a")
+        else:
+            self.log = open(path, "w")
+            self.log.write(json.dumps({"params": self.params}) + "\n")
+            self.log.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, path):
+        entry = self.done.get(path)
+        try:
+            return entry is not None and entry[0] == _stat(path)
+        except FileNotFoundError:
+            return False
+
+    def get(self, path):
+        return self.done[path][1]
+
+    def add(self, path, result):
+        """Record ``path`` as finished; its stat is taken now, after any rewrite."""
+        stat = _stat(path)
+        self.done[path] = (stat, result)
+        self.log.write(json.dumps({"path": path, "stat": stat, "result": result}) + "\n")
+        self.log.flush()
+
+    def close(self):
+        self.log.close()
+
+
+def _item_path(item):
+    return item[0] if isinstance(item, tuple) else item
+
+
+def scan(fn, items, *args, jobs=None, max_pending=None, checkpoint=None,
+         max_tasks_per_child=None):
+    """Yield ``(item, result, error)`` for ``fn(item, *args)`` over ``items``.
+
+    An item is a path, or a tuple ``(path, *per_file_args)`` which is
+    unpacked into ``fn(path, *per_file_args, *args)``.  Checkpointed files
+    are yielded first without running ``fn``; the rest run on a process
+    pool with at most ``max_pending`` (default 2 × jobs) submitted at once
+    and are yielded in completion order.  ``error`` is the exception ``fn``
+    raised, with ``result`` None; failed files are not checkpointed.
+    """
+    jobs = jobs or os.cpu_count()
+    max_pending = max_pending or 2 * jobs
+    todo = []
+    for item in items:
+        if checkpoint is not None and _item_path(item) in checkpoint:
+            yield item, checkpoint.get(_item_path(item)), None
+        else:
+            todo.append(item)
+
+    todo = iter(todo)
+    pending = {}
+    with ProcessPoolExecutor(max_workers=jobs,
+                             max_tasks_per_child=max_tasks_per_child) as pool:
+        while True:
+            for item in todo:
+                call_args = (*item, *args) if isinstance(item, tuple) else (item, *args)
+                pending[pool.submit(fn, *call_args)] = item
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield item, None, e
+                    continue
+                if checkpoint is not None:
+                    checkpoint.add(_item_path(item), result)
+                yield item, result, None
@@ -0,0 +1,165 @@
+"""Typed, machine-readable manifest of the crops sliced from one sheet.
+
+Each sheet's output directory holds a ``manifest.json`` recording, for every
+crop, its box on the sheet, the sha256 of the written crop and (once
+assigned) its semantic name.  The sheet's own sha256 is recorded too, so a
+manifest always says exactly which source bytes it was cut from.
+
+The written image may be trimmed to its alpha bounding box and padded, so
+it need not match the box: ``trim_x``/``trim_y`` are the image's top-left
+corner relative to ``(x, y)`` and ``trim_w``/``trim_h`` its size, and the
+image belongs at ``(x + trim_x, y + trim_y)`` on the sheet.
+
+Deploy scripts read manifests instead of guessing from filenames: semantic
+names are assigned by matching crops against named reference images (see
+crop_match.py), which gives the same names after any re-slice.
+"""
+
+from dataclasses import asdict, dataclass, field
+import glob
+import json
+import os
+
+from asset_cache import write_json
+from crop_match import MAX_DISTANCE, assign, build_index, distances
+
+MANIFEST_NAME = "manifest.json"
+
+
+@dataclass
+class CropRecord:
+    file: str                  # crop path relative to the manifest
+    x: int
+    y: int
+    w: int
+    h: int
+    area: int
+    row: int
+    col: int
+    sha256: str
+    name: str | None = None    # semantic name, e.g. "aoc_glow_ring_sm"
+    trim_x: int = 0            # image offset from (x, y); negative when padded
+    trim_y: int = 0
+    trim_w: int | None = None  # image size; None when the image is the w×h box
+    trim_h: int | None = None
+
+
+@dataclass
+class CropManifest:
+    source: str
+    sheet_sha256: str
+    width: int
+    height: int
+    crops: list[CropRecord] = field(default_factory=list)
+    path: str | None = field(default=None, compare=False)
+
+    def crop_path(self, crop):
+        return os.path.join(os.path.dirname(self.path or ""), crop.file)
+
+    def named(self):
+        return {c.name: c for c in self.crops if c.name}
+
+    def save(self, path=None):
+        self.path = path or self.path
+        data = asdict(self)
+        del data["path"]
+        write_json(self.path, data, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        crops = [CropRecord(**c) for c in data.pop("crops")]
+        return cls(crops=crops, path=path, **data)
+
+
+def load_manifests(root):
+    """Every manifest under ``root``, in path order."""
+    paths = glob.glob(os.path.join(root, "**", MANIFEST_NAME), recursive=True)
+    return [CropManifest.load(p) for p in sorted(paths)]
+
+
+def reference_names(reference_paths):
+    """Semantic name of each reference image: its filename without extension."""
+    return [os.path.splitext(os.path.basename(p))[0] for p in reference_paths]
+
+
+def assign_names(manifests, reference_paths, max_distance=MAX_DISTANCE):
+    """Name crops across ``manifests`` by matching them against references.
+
+    Every crop from every manifest is matched in one distance computation,
+    so each reference name goes to at most one crop.  Existing names are
+    replaced.  Returns the number of crops named.
+    """
+    crops = [(m, c) for m in manifests for c in m.crops]
+    for _, c in crops:
+        c.name = None
+    if not crops or not reference_paths:
+        return 0
+    query = build_index([m.crop_path(c) for m, c in crops])
+    names = reference_names(reference_paths)
+    dist = distances(query, build_index(reference_paths))
+    pairs = assign(dist, max_distance)
+    for i, j, _ in pairs:
+        crops[i][1].name = names[j]
+    return len(pairs)
+
+
+def named_crops(manifests):
+    """Map semantic name -> crop file path across all ``manifests``."""
+    paths = {}
+    for m in manifests:
+        for name, crop in m.named().items():
+            paths[name] = m.crop_path(crop)
+    return paths
+
+
+def all_crops(manifests):
+    """Every crop file path across ``manifests``."""
+    return [m.crop_path(c) for m in manifests for c in m.crops]
+
+
+def deploy_named(targets, crops, cache, mode="copy"):
+    """Copy or link crops to their destinations in one pass.
+
+    ``targets`` maps semantic name -> destination path and ``crops`` maps
+    semantic name -> crop path (see ``named_crops``).  Destination
+    directories are created once each; unchanged destinations are skipped
+    via ``cache``, and ``mode`` is passed to ``AssetCache.copy``.  Returns
+    ``(written, missing)`` lists of names.
+    """
+    for d in {os.path.dirname(dst) for dst in targets.values()}:
+        os.makedirs(d, exist_ok=True)
+    written, missing = [], []
+    for name, dst in targets.items():
+        src = crops.get(name)
+        if src is None:
+            missing.append(name)
+        elif cache.copy(src, dst, mode):
+            written.append(name)
+    return written, missing
+
+
+def main():
+    import argparse
+
+    from slice_sheets import expand_inputs
+
+    parser = argparse.ArgumentParser(
+        description="Assign semantic crop names in existing manifests.")
+    parser.add_argument("root", help="directory searched for manifest.json files")
+    parser.add_argument("--reference", action="append", required=True,
+                        help="named reference images (files, directories or globs)")
+    args = parser.parse_args()
+
+    manifests = load_manifests(args.root)
+    references = expand_inputs(args.reference)
+    named = assign_names(manifests, references)
+    for m in manifests:
+        m.save()
+    print(f"Named {named} crops in {len(manifests)} manifests "
+          f"from {len(references)} references")
+
+
+if __name__ == "__main__":
+    main()
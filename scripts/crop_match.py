@@ -0,0 +1,105 @@
+"""Identify sliced crops by matching them against named reference images.
+
+Every image is reduced to a compact descriptor:
+
+* 128 hash bits: a 64-bit difference hash of the alpha-weighted luminance
+  plus a 64-bit average hash of the alpha mask (silhouette);
+* two shape numbers: log aspect ratio and the fraction of opaque pixels.
+
+The distance between a crop and a reference is the fraction of differing
+hash bits plus ``SHAPE_WEIGHT`` times the shape difference.  All crop ×
+reference distances come from one matrix product, and crops are then
+assigned to references one-to-one, closest pairs first.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+HASH_SIZE = 8
+SHAPE_WEIGHT = 0.5
+MAX_DISTANCE = 0.35
+
+
+def load_rgba(path):
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise FileNotFoundError(f"Could not load image at {path}")
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+    elif img.shape[2] == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    return img
+
+
+def describe(rgba):
+    """Return ``(hash bits, shape vector)`` for a BGRA image.
+
+    The image is first trimmed to its opaque bounding box, so transparent
+    margins do not change the descriptor.
+    """
+    ys, xs = np.nonzero(rgba[:, :, 3])
+    if len(ys):
+        rgba = rgba[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+    alpha = rgba[:, :, 3].astype(np.float32) / 255.0
+    gray = cv2.cvtColor(rgba[:, :, :3], cv2.COLOR_BGR2GRAY).astype(np.float32) * alpha
+
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    dhash = small[:, 1:] > small[:, :-1]
+    mask = cv2.resize(alpha, (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    ahash = mask > mask.mean()
+    bits = np.concatenate([dhash.ravel(), ahash.ravel()])
+
+    h, w = alpha.shape
+    shape = np.array([np.log(w / h), float((alpha > 0).mean())], dtype=np.float32)
+    return bits, shape
+
+
+def build_index(paths):
+    """Stack descriptors of ``paths`` into ``(bits[N, B], shapes[N, 2])``."""
+    described = [describe(load_rgba(p)) for p in paths]
+    bits = np.array([d[0] for d in described], dtype=np.float32).reshape(len(paths), -1)
+    shapes = np.array([d[1] for d in described], dtype=np.float32).reshape(len(paths), 2)
+    return bits, shapes
+
+
+def distances(query, reference):
+    """Crop × reference distance matrix for two ``build_index`` results."""
+    qb, qs = query
+    rb, rs = reference
+    # Hamming distance of 0/1 vectors as a single matrix product.
+    hamming = qb @ (1 - rb).T + (1 - qb) @ rb.T
+    shape = np.abs(qs[:, None, :] - rs[None, :, :]).sum(axis=2)
+    return hamming / max(qb.shape[1], 1) + SHAPE_WEIGHT * shape
+
+
+def assign(dist, max_distance=MAX_DISTANCE):
+    """Greedy one-to-one assignment; returns ``[(query_i, ref_j, distance)]``."""
+    pairs = []
+    used_q = np.zeros(dist.shape[0], dtype=bool)
+    used_r = np.zeros(dist.shape[1], dtype=bool)
+    for flat in np.argsort(dist, axis=None, kind="stable"):
+        i, j = divmod(int(flat), dist.shape[1])
+        d = float(dist[i, j])
+        if d > max_distance:
+            break
+        if used_q[i] or used_r[j]:
+            continue
+        used_q[i] = used_r[j] = True
+        pairs.append((i, j, d))
+    return pairs
+
+
+def match_files(crop_paths, reference_paths, max_distance=MAX_DISTANCE):
+    """Match crop files to reference files; returns ``[(crop, reference, distance)]``."""
+    if not crop_paths or not reference_paths:
+        return []
+    dist = distances(build_index(crop_paths), build_index(reference_paths))
+    return [(crop_paths[i], reference_paths[j], d)
+            for i, j, d in assign(dist, max_distance)]
+
+
+def png_files(directory):
+    return sorted(os.path.join(directory, f)
+                  for f in os.listdir(directory) if f.endswith(".png"))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Find identical and near-identical samples in the Philharmonia corpus.
+
+Two passes, neither of which compares every pair of files:
+
+1. Exact duplicates: files are grouped by sha256 (memoized in the asset
+   cache, so re-runs only hash changed files).
+2. Near duplicates: one file per distinct hash is decoded on a process pool
+   and reduced to a spectral fingerprint (log band energies over the first
+   few seconds after the onset, level-normalized).  Fingerprints are hashed
+   with random-hyperplane LSH into banded buckets; only files sharing a
+   bucket are compared, and pairs with cosine similarity above
+   ``--similarity`` are clustered.
+
+The report (default ``philharmonia-duplicates.json``) lists each cluster
+with its canonical file (first path in sort order) and the bytes that
+linking would reclaim.  ``--link`` replaces exact duplicates with hardlinks
+to the canonical file; ``--link-near`` does the same for near duplicates,
+which replaces their content.
+
+Usage:
+    python3 scripts/dedupe_philharmonia.py
+    python3 scripts/dedupe_philharmonia.py --similarity 0.99 --link
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from asset_cache import AssetCache, place_file
+from corpus_scan import scan
+from philharmonia import AUDIO_DIR, decode_audio, sample_paths
+
+FP_RATE = 11025
+FP_SECONDS = 3.0
+N_FFT = 4096
+HOP = 1024
+FP_BANDS = 84          # about one band per semitone above 60 Hz
+FP_SLICES = 6
+FP_RANGE_DB = 50        # band energies this far below the loudest are clamped
+LSH_BITS = 128
+LSH_BANDS = 8           # LSH_BITS / LSH_BANDS bits must match to share a bucket
+SIMILARITY = 0.98
+
+
+def fingerprint(samples, rate=FP_RATE):
+    """Unit-length ``FP_SLICES × FP_BANDS`` log-spectrum vector, or None if silent."""
+    level = np.abs(samples)
+    if len(samples) == 0 or level.max() == 0:
+        return None
+    samples = samples[int(np.argmax(level >= level.max() * 0.01)):]
+    if len(samples) < N_FFT:
+        samples = np.pad(samples, (0, N_FFT - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, N_FFT)[::HOP]
+    power = np.abs(np.fft.rfft(frames * np.hanning(N_FFT), axis=1)) ** 2
+
+    edges = np.geomspace(60, rate / 2, FP_BANDS + 1) * N_FFT / rate
+    edges = np.unique(np.clip(edges.astype(int), 1, N_FFT // 2))
+    bands = np.log10(np.add.reduceat(power, edges[:-1], axis=1) + 1e-10)
+    bands = np.pad(bands, ((0, 0), (0, FP_BANDS - bands.shape[1])), mode="edge")
+    # Clamp the noise floor so hiss and encoder noise do not dominate the match.
+    bands = np.maximum(bands, bands.max() - FP_RANGE_DB / 10)
+
+    slices = np.array_split(bands, FP_SLICES) if len(bands) >= FP_SLICES else [bands] * FP_SLICES
+    vec = np.stack([s.mean(axis=0) for s in slices]).ravel()
+    vec -= vec.mean()
+    norm = np.linalg.norm(vec)
+    return (vec / norm).astype(np.float32) if norm else None
+
+
+def file_fingerprint(path):
+    return fingerprint(decode_audio(path, sample_rate=FP_RATE, seconds=FP_SECONDS + 1))
+
+
+def candidate_pairs(vectors, bits=LSH_BITS, bands=LSH_BANDS, seed=0):
+    """Index pairs whose random-hyperplane signatures agree on at least one band."""
+    planes = np.random.default_rng(seed).standard_normal((bits, vectors.shape[1]))
+    signs = (vectors @ planes.T > 0).reshape(len(vectors), bands, bits // bands)
+    weights = 1 << np.arange(bits // bands, dtype=np.int64)
+    keys = signs @ weights                                # (n, bands)
+    pairs = set()
+    for band in range(bands):
+        buckets = {}
+        for i, key in enumerate(keys[:, band].tolist()):
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    pairs.add((members[a], members[b]))
+    return np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+
+
+def clusters(n, pairs):
+    """Connected components (size > 1) of ``pairs`` over ``range(n)``."""
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in pairs:
+        parent[find(a)] = find(b)
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio-dir", default=AUDIO_DIR, help="corpus root")
+    parser.add_argument("--report", default="philharmonia-duplicates.json")
+    parser.add_argument("--similarity", type=float, default=SIMILARITY,
+                        help="cosine similarity that counts as a near duplicate")
+    parser.add_argument("--link", action="store_true",
+                        help="hardlink exact duplicates to their canonical file")
+    parser.add_argument("--link-near", action="store_true",
+                        help="also hardlink near duplicates (replaces their audio)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    paths = sample_paths(args.audio_dir)
+    rel = {p: os.path.relpath(p, args.audio_dir).replace(os.sep, "/") for p in paths}
+    with AssetCache() as cache:
+        by_hash = {}
+        for p in paths:
+            by_hash.setdefault(cache.digest(p), []).append(p)
+    exact = [sorted(g) for g in by_hash.values() if len(g) > 1]
+    canonical = sorted(g[0] for g in by_hash.values())
+    print(f"{len(paths)} files, {len(exact)} exact duplicate groups")
+
+    prints = {}
+    for path, fp, error in scan(file_fingerprint, canonical, jobs=args.jobs):
+        if error is not None:
+            print(f"Error: {error}")
+        elif fp is not None:
+            prints[path] = fp
+    fp_paths = sorted(prints)
+    near = []
+    if fp_paths:
+        vectors = np.stack([prints[p] for p in fp_paths])
+        pairs = candidate_pairs(vectors)
+        if len(pairs):
+            sims = np.einsum("ij,ij->i", vectors[pairs[:, 0]], vectors[pairs[:, 1]])
+            pairs = pairs[sims >= args.similarity]
+            print(f"{len(fp_paths)} fingerprints, {len(sims)} LSH candidates, "
+                  f"{len(pairs)} near-duplicate pairs")
+        near = [sorted(fp_paths[i] for i in g) for g in clusters(len(fp_paths), pairs)]
+
+    def group_report(group):
+        return {"canonical": rel[group[0]],
+                "duplicates": [rel[p] for p in group[1:]],
+                "reclaimableBytes": sum(os.path.getsize(p) for p in group[1:])}
+
+    report = {"exact": [group_report(g) for g in exact],
+              "near": [group_report(g) for g in near],
+              "similarity": args.similarity}
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=1)
+        f.write("\n")
+    exact_bytes = sum(g["reclaimableBytes"] for g in report["exact"])
+    near_bytes = sum(g["reclaimableBytes"] for g in report["near"])
+    print(f"Exact: {len(exact)} groups, {exact_bytes / 1e6:.1f} MB; "
+          f"near: {len(near)} groups, {near_bytes / 1e6:.1f} MB -> {args.report}")
+
+    linked = 0
+    to_link = (exact if args.link or args.link_near else []) + (near if args.link_near else [])
+    for group in to_link:
+        for dup in group[1:]:
+            if not os.path.samefile(group[0], dup):
+                place_file(group[0], dup, "hardlink")
+                linked += 1
+    if to_link:
+        print(f"Hardlinked {linked} files")
+
+
+if __name__ == "__main__":
+    main()
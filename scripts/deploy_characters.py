@@ -1,12 +1,22 @@
 
+import argparse
 import os
-import shutil
-import cv2
+
+from asset_cache import LINK_MODES, AssetCache
+from crop_manifest import all_crops, deploy_named, load_manifests
+from crop_match import match_files
+
+parser = argparse.ArgumentParser(description="Deploy character crops matched to the current art.")
+parser.add_argument("--mode", choices=LINK_MODES, default="copy",
+                    help="copy bytes, or reflink/hardlink them to save disk and I/O")
+args = parser.parse_args()
 
 sliced_dir = "sliced_assets"
 target_dir = "client/public/aoc/characters"
-
-os.makedirs(target_dir, exist_ok=True)
+# Crops are named by matching against this versioned reference set (128 px
+# thumbnails of the approved art), never against what is currently deployed,
+# so a wrong match cannot become the next run's reference.
+reference_dir = "scripts/references/characters"
 
 ordered_names = [
     "aoc_character_violin.png",
@@ -32,33 +42,19 @@ ordered_names = [
     "aoc_character_xylophone.png"
 ]
 
-files = [f for f in os.listdir(sliced_dir) if f.endswith(".png")]
-
-# Get sizes
-file_stats = []
-for f in files:
-    path = os.path.join(sliced_dir, f)
-    size = os.path.getsize(path)
-    # Extract index for sorting
-    idx = int(f.split('_')[1].split('.')[0]) if 'asset' in f else 999
-    file_stats.append({'file': f, 'size': size, 'idx': idx})
-
-# Sort by size desc to find candidates
-file_stats.sort(key=lambda x: x['size'], reverse=True)
+available = set(os.listdir(reference_dir))
+references = [os.path.join(reference_dir, n) for n in ordered_names if n in available]
+matches = match_files(all_crops(load_manifests(sliced_dir)), references)
 
-# Take top 18
-candidates = file_stats[:18]
+print(f"Matched {len(matches)} of {len(references)} reference characters")
 
-# Sort candidates by Index (Y-order) to match ordered_names
-candidates.sort(key=lambda x: x['idx'])
+crops = {os.path.basename(ref): src for src, ref, _ in matches}
+targets = {name: os.path.join(target_dir, name) for name in ordered_names}
 
-print(f"Selected {len(candidates)} candidates based on size")
+with AssetCache() as cache:
+    written, missing = deploy_named(targets, crops, cache, args.mode)
 
-for i, cand in enumerate(candidates):
-    src = cand['file']
-    if i < len(ordered_names):
-        dst = ordered_names[i]
-        shutil.copy2(os.path.join(sliced_dir, src), os.path.join(target_dir, dst))
-        print(f"Deployed {src} ({cand['size']} bytes) -> {dst}")
-    else:
-        print(f"Extra file {src} ignored")
+for name in written:
+    print(f"Deployed {os.path.basename(crops[name])} -> {name}")
+for name in missing:
+    print(f"Warning: no crop matched {name}")
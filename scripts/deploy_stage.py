@@ -1,35 +1,39 @@
 
+import argparse
 import os
-import shutil
+
+from asset_cache import LINK_MODES, AssetCache
+from crop_manifest import deploy_named, load_manifests, named_crops
+
+parser = argparse.ArgumentParser(description="Deploy named stage crops.")
+parser.add_argument("--mode", choices=LINK_MODES, default="copy",
+                    help="copy bytes, or reflink/hardlink them to save disk and I/O")
+args = parser.parse_args()
 
 sliced_dir = "sliced_assets"
 target_dir = "client/public/aoc/stage"
 
-os.makedirs(target_dir, exist_ok=True)
-
-# Mapping based on 2x2 grid assumption
-# 0: TL, 1: TR, 2: BL, 3: BR
-# Guessing:
-# 0 -> Backwall
-# 2 -> Floor
-# 1 -> Spotlight?
-# 3 -> Vignette?
+# Mapping: semantic crop name -> deployed filename
+# Names come from the slicer manifests, e.g.
+#   python3 scripts/slice_sheets.py <sheet> --reference "client/public/aoc/stage/*.png"
+# 2x2 grid: backwall (TL), overlay 1 (TR), floor (BL), overlay 2 (BR)
 
 mapping = {
-    "sy.png": "aoc_stage_backwall.png", # Object 0
-    "_aeon__loe_eee_ee_ofan_ae_eee_ee._bess_eee7a_ee_ee2_nen_a.png": "aoc_stage_overlay_1.png", # Object 1
-    "asset_2.png": "aoc_stage_floor.png", # Object 2
-    "asset_3.png": "aoc_stage_overlay_2.png", # Object 3
+    "aoc_stage_backwall": "aoc_stage_backwall.png",
+    "aoc_stage_overlay_1": "aoc_stage_overlay_1.png",
+    "aoc_stage_floor": "aoc_stage_floor.png",
+    "aoc_stage_overlay_2": "aoc_stage_overlay_2.png",
 }
 
-for src, dst in mapping.items():
-    src_path = os.path.join(sliced_dir, src)
-    dst_path = os.path.join(target_dir, dst)
-    
-    if os.path.exists(src_path):
-        print(f"Moving {src} -> {dst}")
-        shutil.copy2(src_path, dst_path)
-    else:
-        print(f"Warning: {src} not found")
-        
+targets = {name: os.path.join(target_dir, dst) for name, dst in mapping.items()}
+
+with AssetCache() as cache:
+    crops = named_crops(load_manifests(sliced_dir))
+    written, missing = deploy_named(targets, crops, cache, args.mode)
+
+for name in written:
+    print(f"Moving {name} -> {mapping[name]}")
+for name in missing:
+    print(f"Warning: no crop named {name} in manifests")
+
 print("Stage assets deployed")
@@ -1,46 +1,11 @@
 
-import cv2
-import numpy as np
-import os
+from sprite_slicer import group_rows, load_sheet, sheet_arg, soften_boxes, write_crops
 
-image_path = "/Users/cnowlin/.cursor/projects/Users-cnowlin-Developer-Musically-Nowlin-Games/assets/Gemini_Generated_Image_kxjrvnkxjrvnkxjr-ea89c400-b3c3-4bd2-9f21-9a914455af89.png"
+image_path = sheet_arg("/Users/cnowlin/.cursor/projects/Users-cnowlin-Developer-Musically-Nowlin-Games/assets/Gemini_Generated_Image_kxjrvnkxjrvnkxjr-ea89c400-b3c3-4bd2-9f21-9a914455af89.png")
 base_dir = "/Users/cnowlin/Developer/Musically-Nowlin-Games/client/src/assets/aoc"
 
-# Load image
-img = cv2.imread(image_path)
-if img is None:
-    print("Error loading image")
-    exit(1)
-
-# Background removal
-bg_color = img[0, 0] # [76, 81, 80]
-lower_bound = np.maximum(bg_color - 20, 0)
-upper_bound = np.minimum(bg_color + 20, 255)
-mask = cv2.inRange(img, lower_bound, upper_bound)
-# Invert mask: background is 255 in mask, we want background to be 0 alpha
-alpha_mask = cv2.bitwise_not(mask)
-
-# Refine mask to remove noise
-kernel = np.ones((3,3), np.uint8)
-alpha_mask = cv2.morphologyEx(alpha_mask, cv2.MORPH_OPEN, kernel)
-
-# Create RGBA image
-b, g, r = cv2.split(img)
-rgba = cv2.merge([b, g, r, alpha_mask])
-
-# Find contours on mask
-contours, _ = cv2.findContours(alpha_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-# Filter valid contours
-min_height = 50
-valid_boxes = []
-for c in contours:
-    x, y, w, h = cv2.boundingRect(c)
-    if h > min_height:
-        valid_boxes.append((x, y, w, h))
-
-# Sort boxes by Y
-valid_boxes.sort(key=lambda b: b[1])
+sheet = load_sheet(image_path, min_height=50)
+valid_boxes = sheet.boxes # Sorted by Y
 
 # Categorize
 row1 = [] # Chairs/Stands
@@ -48,26 +13,7 @@ row2 = [] # Glows/Spotlight
 notes = [] # Notes (Left side)
 guides = [] # Guides (Right side)
 
-# Helper to group by Y
-def group_by_y(boxes, threshold=100):
-    rows = []
-    current_row = []
-    if not boxes: return rows
-    
-    current_y = boxes[0][1]
-    
-    for box in boxes:
-        if box[1] > current_y + threshold:
-            rows.append(current_row)
-            current_row = [box]
-            current_y = box[1]
-        else:
-            current_row.append(box)
-    if current_row:
-        rows.append(current_row)
-    return rows
-
-rows = group_by_y(valid_boxes)
+rows = group_rows(valid_boxes, threshold=100)
 
 # Map rows to categories
 # Row 0: 5 items
@@ -119,29 +65,16 @@ filenames_row2 = [
 filenames_notes = [f"overlays/aoc_particle_note_{i+1}.png" for i in range(8)]
 filenames_guides = [f"seating/aoc_seating_row_{i+1}.png" for i in range(4)]
 
-# Save function
-def save_crop(box, rel_path):
-    x, y, w, h = box
-    crop = rgba[y:y+h, x:x+w]
-    full_path = os.path.join(base_dir, rel_path)
-    os.makedirs(os.path.dirname(full_path), exist_ok=True)
-    cv2.imwrite(full_path, crop)
-    print(f"Saved {rel_path}")
-
-# Execute save
-for i, box in enumerate(row1):
-    if i < len(filenames_row1):
-        save_crop(box, filenames_row1[i])
-
-for i, box in enumerate(row2):
-    if i < len(filenames_row2):
-        save_crop(box, filenames_row2[i])
+# Glows and note particles are translucent; solid art keeps the hard mask
+soften_boxes(sheet, row2 + notes)
 
-for i, box in enumerate(notes):
-    if i < len(filenames_notes):
-        save_crop(box, filenames_notes[i])
-
-for i, box in enumerate(guides):
-    if i < len(filenames_guides):
-        save_crop(box, filenames_guides[i])
+# Collect every crop, then write them all from the one loaded sheet
+crops = []
+crops += list(zip(row1, filenames_row1))
+crops += list(zip(row2, filenames_row2))
+crops += list(zip(notes, filenames_notes))
+crops += list(zip(guides, filenames_guides))
 
+write_crops(sheet, crops, base_dir)
+for _, rel_path in crops:
+    print(f"Saved {rel_path}")
@@ -1,63 +1,32 @@
 
-import cv2
-import numpy as np
 import os
+import sys
 
-image_path = "/Users/cnowlin/.cursor/projects/Users-cnowlin-Developer-Musically-Nowlin-Games/assets/Gemini_Generated_Image_kxjrvnkxjrvnkxjr-ea89c400-b3c3-4bd2-9f21-9a914455af89.png"
-base_dir = "/Users/cnowlin/Developer/Musically-Nowlin-Games/client/src/assets/aoc"
+import palette_png
+import sprite_slicer
+from asset_cache import AssetCache
+from sprite_slicer import group_rows, load_sheet, sheet_arg, soften_boxes, write_crops
 
-# Load image
-img = cv2.imread(image_path)
-if img is None:
-    print("Error loading image")
-    exit(1)
+image_path = sheet_arg("/Users/cnowlin/.cursor/projects/Users-cnowlin-Developer-Musically-Nowlin-Games/assets/Gemini_Generated_Image_kxjrvnkxjrvnkxjr-ea89c400-b3c3-4bd2-9f21-9a914455af89.png")
+base_dir = "/Users/cnowlin/Developer/Musically-Nowlin-Games/client/src/assets/aoc"
 
-# Background removal
-bg_color = img[0, 0]
-lower_bound = np.maximum(bg_color - 20, 0)
-upper_bound = np.minimum(bg_color + 20, 255)
-mask = cv2.inRange(img, lower_bound, upper_bound)
-alpha_mask = cv2.bitwise_not(mask)
-kernel = np.ones((3,3), np.uint8)
-alpha_mask = cv2.morphologyEx(alpha_mask, cv2.MORPH_OPEN, kernel)
-b, g, r = cv2.split(img)
-rgba = cv2.merge([b, g, r, alpha_mask])
+# Skip the whole run when the sheet, this layout and the slicer are unchanged
+# and every crop from the last run is still on disk.
+cache = AssetCache()
+cache_key = cache.key(image_path, __file__, sprite_slicer.__file__, palette_png.__file__,
+                      base_dir=base_dir)
+if cache.fresh(cache_key):
+    print("All crops up to date")
+    cache.save()
+    sys.exit(0)
 
-# Find contours
-contours, _ = cv2.findContours(alpha_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-min_area = 500
-valid_contours = [c for c in contours if cv2.contourArea(c) > min_area]
-boxes = [cv2.boundingRect(c) for c in valid_contours]
-boxes.sort(key=lambda b: b[1]) # Sort by Y
+sheet = load_sheet(image_path, min_area=500)
+rows = group_rows(sheet.boxes)
 
-# Robust row grouping
-rows = []
-current_row = []
-if boxes:
-    current_row_y = boxes[0][1]
-    current_row_h = boxes[0][3]
-    for box in boxes:
-        x, y, w, h = box
-        if y > current_row_y + current_row_h * 0.5:
-            current_row.sort(key=lambda b: b[0])
-            rows.append(current_row)
-            current_row = [box]
-            current_row_y = y
-            current_row_h = h
-        else:
-            current_row.append(box)
-            current_row_h = max(current_row_h, h)
-    if current_row:
-        current_row.sort(key=lambda b: b[0])
-        rows.append(current_row)
+crops = []
 
 def save_crop(box, rel_path):
-    x, y, w, h = box
-    crop = rgba[y:y+h, x:x+w]
-    full_path = os.path.join(base_dir, rel_path)
-    os.makedirs(os.path.dirname(full_path), exist_ok=True)
-    cv2.imwrite(full_path, crop)
-    print(f"Saved {rel_path}")
+    crops.append((box, rel_path))
 
 # Extract Assets based on identified structure
 
@@ -112,3 +81,12 @@ if len(rows) > 7:
         save_crop(r[4], "seating/aoc_seating_row_3.png")
     if len(r) > 5:
         save_crop(r[5], "seating/aoc_seating_row_4.png")
+
+# Glows, haze and note particles are translucent; solid art keeps the hard mask
+soften_boxes(sheet, [box for box, rel in crops if rel.startswith("overlays/")])
+write_crops(sheet, crops, base_dir)
+for _, rel_path in crops:
+    print(f"Saved {rel_path}")
+
+cache.record(cache_key, [os.path.join(base_dir, rel) for _, rel in crops])
+cache.save()
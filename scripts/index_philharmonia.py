@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Build the Philharmonia sample manifest.
+
+Every MP3 under client/public/audio/philharmonia is parsed by name and
+probed (duration, sample rate, bitrate) from its MPEG headers on a process
+pool.  The result is written as one compact JSON manifest:
+
+    {
+      "version": 1,
+      "root": "/audio/philharmonia",
+      "fields": ["path", "duration", "seconds", "sampleRate", "bitrate", "channels", "bytes"],
+      "samples": [["strings/violin/violin_C5_05_forte_arco-normal.mp3", "05", ...], ...],
+      "index": {"violin": {"C5": {"forte": {"arco-normal": [17, 18]}}}}
+    }
+
+``index[instrument][pitch][dynamic][articulation]`` lists sample ids (rows
+of ``samples``), shortest note first, so a game resolves a note with plain
+object lookups instead of guessing URLs.  Unpitched percussion is filed
+under the pitch ``"unpitched"``; names without an articulation under
+``"normal"``.
+
+Columns added later by the analysis tools (``onset``/``end``, ``loudness``/
+``gain``, ``frequency``/``cents``, ...) are carried over from the previous
+manifest for every sample whose path and size are unchanged; changed or new
+files get None there until the tools are re-run.
+
+Usage:
+    python3 scripts/index_philharmonia.py
+    python3 scripts/index_philharmonia.py --audio-dir some/dir --out manifest.json
+"""
+
+import argparse
+import os
+
+from corpus_scan import scan
+from philharmonia import (AUDIO_DIR, MANIFEST_PATH, URL_ROOT, load_manifest,
+                          parse_sample_name, probe_mp3, sample_paths, save_manifest,
+                          set_column)
+
+FIELDS = ["path", "duration", "seconds", "sampleRate", "bitrate", "channels", "bytes"]
+DURATION_ORDER = ["025", "05", "1", "15", "long", "very-long", "phrase", ""]
+DEFAULT_ARTICULATION = "normal"
+
+
+def index_file(path):
+    name = parse_sample_name(path)
+    if name is None:
+        return None, None
+    try:
+        info = probe_mp3(path)
+    except (OSError, ValueError) as e:
+        return name, str(e)
+    return name, info
+
+
+def duration_rank(code):
+    return DURATION_ORDER.index(code) if code in DURATION_ORDER else len(DURATION_ORDER)
+
+
+def build_manifest(results, audio_dir):
+    """Assemble the manifest from ``(path, SampleName, info)`` results."""
+    rows = sorted(results, key=lambda r: (r[1].instrument, r[1].pitch, r[1].dynamic,
+                                          r[1].articulation, duration_rank(r[1].duration),
+                                          r[0]))
+    samples = []
+    index = {}
+    for path, name, info in rows:
+        rel = os.path.relpath(path, audio_dir).replace(os.sep, "/")
+        samples.append([rel, name.duration, info["seconds"], info["sampleRate"],
+                        info["bitrate"], info["channels"], info["bytes"]])
+        cell = (index.setdefault(name.instrument, {})
+                     .setdefault(name.pitch, {})
+                     .setdefault(name.dynamic, {})
+                     .setdefault(name.articulation or DEFAULT_ARTICULATION, []))
+        cell.append(len(samples) - 1)
+    return {"version": 1, "root": URL_ROOT, "fields": list(FIELDS),
+            "samples": samples, "index": index}
+
+
+def carry_columns(manifest, previous):
+    """Copy ``previous``'s extra columns onto rows whose path and bytes are unchanged."""
+    fields = previous["fields"]
+    path_col, bytes_col = fields.index("path"), fields.index("bytes")
+    sizes = {row[0]: row[FIELDS.index("bytes")] for row in manifest["samples"]}
+    kept = [row for row in previous["samples"] if sizes.get(row[path_col]) == row[bytes_col]]
+    for field in fields:
+        if field not in FIELDS:
+            col = fields.index(field)
+            set_column(manifest, field, {row[path_col]: row[col] for row in kept})
+    return len(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio-dir", default=AUDIO_DIR, help="corpus root")
+    parser.add_argument("--out", default=MANIFEST_PATH, help="manifest path")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    paths = sample_paths(args.audio_dir)
+    results = []
+    skipped = 0
+    for path, result, error in scan(index_file, paths, jobs=args.jobs):
+        name, info = result or (None, error)
+        if error is None and name is None:
+            print(f"Warning: unrecognised sample name {path}")
+            skipped += 1
+        elif error is not None or isinstance(info, str):
+            print(f"Warning: could not probe {path}: {info}")
+            skipped += 1
+        else:
+            results.append((path, name, info))
+
+    manifest = build_manifest(results, args.audio_dir)
+    if os.path.exists(args.out):
+        carried = carry_columns(manifest, load_manifest(args.out))
+        print(f"Kept analysis columns for {carried} unchanged samples")
+    save_manifest(manifest, args.out)
+    print(f"Indexed {len(results)} samples "
+          f"({len(manifest['index'])} instruments, {skipped} skipped) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
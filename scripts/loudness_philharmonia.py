@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Measure sample loudness and store the gain that levels the corpus.
+
+Each sample in the corpus manifest is decoded to mono PCM on a process pool
+(see corpus_scan.py; measurements are checkpointed so interrupted runs
+resume) and measured with the ITU-R BS.1770 / EBU R128 integrated
+loudness: a K-weighting filter, 400 ms blocks with 75% overlap, then the
+-70 LUFS absolute gate and the -10 LU relative gate.  The K-weighting is applied in
+the frequency domain so the whole file is filtered with one FFT.  ``--method
+rms`` uses plain RMS (dBFS) instead.
+
+Gains are stored in the manifest's ``loudness`` and ``gain`` columns (dB;
+play at ``10 ** (gain / 20)``).  By default one gain is computed per
+instrument, moving the instrument's median loudness to ``--target``, so a
+pianissimo stays quieter than a fortissimo; ``--per sample`` levels every
+file on its own.  With ``--write`` the gain is baked into the files instead
+(re-encoded in place, limited so peaks stay under ``--ceiling``); the
+``loudness`` column then describes the rewritten file and ``gain`` keeps
+whatever could not be applied.
+
+Run index_philharmonia.py first; re-indexing keeps these columns for
+unchanged files.
+
+Usage:
+    python3 scripts/loudness_philharmonia.py
+    python3 scripts/loudness_philharmonia.py --per sample --target -18 --write
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+
+import numpy as np
+
+from asset_cache import sha256_file
+from corpus_scan import Checkpoint, checkpoint_path, scan
+from philharmonia import (AUDIO_DIR, DECODE_RATE, MANIFEST_PATH, decode_audio, load_manifest,
+                          probe_mp3, run_ffmpeg, save_manifest, set_column)
+
+TARGET = -23.0          # LUFS (or dBFS RMS)
+CEILING = -1.0          # dBFS peak allowed after baking a gain in
+BLOCK = 0.4             # seconds per gating block
+STEP = 0.1              # seconds between block starts (75% overlap)
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+SILENT = -120.0
+
+
+def k_weighting(n, rate):
+    """Complex response of the BS.1770 K-weighting filter at ``rfft`` bins of length ``n``."""
+    # Pre-filter (high shelf), then RLB high-pass; coefficients re-derived
+    # for ``rate`` as in libebur128.
+    k = np.tan(np.pi * 1681.974450955533 / rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0,
+               (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    k = np.tan(np.pi * 38.13547087602444 / rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    hp_b = [1, -2, 1]
+    hp_a = [1, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    z = np.exp(-1j * np.pi * np.arange(n // 2 + 1) / (n // 2))
+    response = np.ones_like(z)
+    for b, a in ((shelf_b, shelf_a), (hp_b, hp_a)):
+        response *= ((b[0] + b[1] * z + b[2] * z * z) /
+                     (a[0] + a[1] * z + a[2] * z * z))
+    return response
+
+
+def integrated_loudness(samples, rate=DECODE_RATE):
+    """Gated BS.1770 loudness of mono ``samples`` in LUFS."""
+    if len(samples) == 0:
+        return SILENT
+    pad = rate  # room for the filter's ringing before the circular wrap
+    n = 1 << int(np.ceil(np.log2(len(samples) + pad)))
+    weighted = np.fft.irfft(np.fft.rfft(samples, n) * k_weighting(n, rate), n)
+    power = weighted[:len(samples)] ** 2
+
+    block, step = int(BLOCK * rate), int(STEP * rate)
+    if len(power) <= block:
+        blocks = np.array([power.mean()])
+    else:
+        csum = np.concatenate(([0.0], np.cumsum(power)))
+        starts = np.arange(0, len(power) - block + 1, step)
+        blocks = (csum[starts + block] - csum[starts]) / block
+
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10 * np.log10(blocks)
+    gated = blocks[levels > ABSOLUTE_GATE]
+    if len(gated) == 0:
+        return SILENT
+    relative = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = blocks[(levels > ABSOLUTE_GATE) & (levels > relative)]
+    return round(float(-0.691 + 10 * np.log10(gated.mean())), 2)
+
+
+def rms_level(samples):
+    if len(samples) == 0:
+        return SILENT
+    ms = float(np.mean(samples.astype(np.float64) ** 2))
+    return round(10 * np.log10(ms), 2) if ms else SILENT
+
+
+def peak_level(samples):
+    peak = float(np.abs(samples).max()) if len(samples) else 0.0
+    return 20 * np.log10(peak) if peak else SILENT
+
+
+def measure_file(path, method):
+    """``(loudness, peak dBFS)`` of ``path``."""
+    samples = decode_audio(path)
+    loudness = rms_level(samples) if method == "rms" else integrated_loudness(samples)
+    return loudness, round(peak_level(samples), 2)
+
+
+def bake_gain(path, gain_db):
+    bitrate = probe_mp3(path)["bitrate"]
+    run_ffmpeg(["-i", path, "-af", f"volume={gain_db:.2f}dB", "-c:a", "libmp3lame",
+                "-b:a", f"{bitrate}k", "-f", "mp3"], path)
+    return probe_mp3(path)
+
+
+def sample_instruments(manifest):
+    """Sample id -> instrument, from the manifest index."""
+    owner = {}
+    for instrument, pitches in manifest["index"].items():
+        for dynamics in pitches.values():
+            for articulations in dynamics.values():
+                for ids in articulations.values():
+                    for sid in ids:
+                        owner[sid] = instrument
+    return owner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio-dir", default=AUDIO_DIR, help="corpus root")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="corpus manifest")
+    parser.add_argument("--method", choices=("r128", "rms"), default="r128")
+    parser.add_argument("--target", type=float, default=TARGET,
+                        help="target loudness in LUFS (dBFS for rms)")
+    parser.add_argument("--per", choices=("instrument", "sample"), default="instrument",
+                        help="level whole instruments or every sample on its own")
+    parser.add_argument("--write", action="store_true", help="bake the gains into the files")
+    parser.add_argument("--ceiling", type=float, default=CEILING,
+                        help="peak limit in dBFS when baking gains in")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    rels = [row[manifest["fields"].index("path")] for row in manifest["samples"]]
+    paths = [os.path.join(args.audio_dir, *rel.split("/")) for rel in rels]
+    owner = sample_instruments(manifest)
+
+    ids = {p: sid for sid, p in enumerate(paths)}
+    params = {"tool": sha256_file(__file__), "method": args.method}
+
+    measured = {}
+    failed = 0
+    with Checkpoint(checkpoint_path("loudness_philharmonia"), params) as done:
+        for path, result, error in scan(measure_file, paths, args.method, jobs=args.jobs,
+                                        checkpoint=done):
+            if error is not None:
+                failed += 1
+                print(f"Error: {error}")
+                continue
+            measured[ids[path]] = tuple(result)
+
+    audible = {sid: m for sid, m in measured.items() if m[0] > SILENT}
+    if args.per == "instrument":
+        groups = {}
+        for sid, (loudness, _) in audible.items():
+            groups.setdefault(owner.get(sid), []).append(loudness)
+        group_gain = {g: args.target - float(np.median(v)) for g, v in groups.items()}
+        gains = {sid: group_gain[owner.get(sid)] for sid in audible}
+    else:
+        gains = {sid: args.target - loudness for sid, (loudness, _) in audible.items()}
+
+    loudness = {sid: m[0] for sid, m in measured.items()}
+    seconds, sizes = {}, {}
+    if args.write:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            applied = {sid: min(gain, args.ceiling - measured[sid][1])
+                       for sid, gain in gains.items()}
+            futures = {sid: pool.submit(bake_gain, paths[sid], g)
+                       for sid, g in applied.items() if abs(g) >= 0.1}
+            for sid, future in futures.items():
+                try:
+                    info = future.result()
+                except (RuntimeError, OSError) as e:
+                    failed += 1
+                    print(f"Error: {e}")
+                    continue
+                seconds[rels[sid]], sizes[rels[sid]] = info["seconds"], info["bytes"]
+                gains[sid] -= applied[sid]
+                loudness[sid] = round(loudness[sid] + applied[sid], 2)
+
+    set_column(manifest, "loudness", {rels[sid]: v for sid, v in loudness.items()})
+    set_column(manifest, "gain", {rels[sid]: round(g, 2) for sid, g in gains.items()})
+    set_column(manifest, "seconds", seconds)
+    set_column(manifest, "bytes", sizes)
+    save_manifest(manifest, args.manifest)
+
+    spread = [m[0] for m in audible.values()]
+    if spread:
+        print(f"Loudness {min(spread):.1f} .. {max(spread):.1f} "
+              f"(median {np.median(spread):.1f}) over {len(spread)} samples")
+    print(f"Stored gains for {len(gains)} samples ({len(sizes)} rewritten, "
+          f"{failed} failed) -> {args.manifest}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Pack the Philharmonia samples each game loads into one audio sprite.
+
+The games preload every sample of their instruments from
+client/src/common/instruments/instrumentLibrary.ts, one fetch and one
+decodeAudioData per file.  This script decodes those samples on a process
+pool, lays them end to end with a short silent gap, and encodes each game's
+set as a single file with an offset table beside it:
+
+    client/public/audio/sprites/instrument-detective.mp3
+    client/public/audio/sprites/instrument-detective.json
+
+    {
+      "file": "/audio/sprites/instrument-detective.mp3",
+      "sampleRate": 44100,
+      "sprites": {"philharmonia/strings/violin/violin_C5_05_forte_arco-normal.mp3":
+                  {"start": 0.0, "duration": 0.7314}, ...}
+    }
+
+Keys are the ``path`` values from the instrument library, so the client
+can swap a per-file fetch for a slice of the decoded sprite buffer.  Games
+are rebuilt only when one of their samples (or this script) changes.
+
+Usage:
+    python3 scripts/pack_audio_sprites.py
+    python3 scripts/pack_audio_sprites.py --game tone-color-match
+    python3 scripts/pack_audio_sprites.py --game custom=flute,violin --bitrate 96k
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import re
+
+import numpy as np
+
+from asset_cache import AssetCache, write_json
+from philharmonia import DECODE_RATE, ROOT, decode_audio, parse_sample_name, run_ffmpeg
+
+PUBLIC_AUDIO = os.path.join(ROOT, "client", "public", "audio")
+LIBRARY_PATH = os.path.join(ROOT, "client", "src", "common", "instruments",
+                            "instrumentLibrary.ts")
+OUT_DIR = os.path.join(PUBLIC_AUDIO, "sprites")
+URL_ROOT = "/audio/sprites"
+# Silence between samples; also absorbs the MP3 encoder delay in decoders
+# that ignore the gapless header.
+GAP = 0.05
+BITRATE = "128k"
+
+# Instruments each game preloads (see the usePhilharmoniaInstruments calls).
+GAMES = {
+    "instrument-detective": [
+        "violin", "viola", "cello", "double-bass",
+        "flute", "clarinet", "oboe", "bassoon", "saxophone",
+        "trumpet", "french-horn", "trombone", "tuba",
+        "timpani", "xylophone", "glockenspiel",
+    ],
+    "tone-color-match": [
+        "flute", "clarinet", "oboe", "violin", "cello", "trumpet", "french-horn",
+    ],
+}
+
+LIBRARY_PATH_RE = re.compile(r"""path:\s*['"](philharmonia/[^'"]+\.mp3)['"]""")
+
+
+def library_samples(library_path=LIBRARY_PATH):
+    """Instrument -> sample paths (relative to /audio) listed in the instrument library."""
+    with open(library_path) as f:
+        text = f.read()
+    samples = {}
+    for path in LIBRARY_PATH_RE.findall(text):
+        name = parse_sample_name(path)
+        if name is not None:
+            samples.setdefault(name.instrument, []).append(path)
+    return samples
+
+
+def parse_game(value):
+    """``name`` for a built-in game, or ``name=inst1,inst2`` for a custom set."""
+    name, sep, instruments = value.partition("=")
+    if sep:
+        return name, [i.strip() for i in instruments.split(",") if i.strip()]
+    if name not in GAMES:
+        raise argparse.ArgumentTypeError(f"unknown game {name!r} (known: {', '.join(GAMES)})")
+    return name, GAMES[name]
+
+
+def pack(decoded, order, rate=DECODE_RATE, gap=GAP):
+    """Concatenate ``decoded[path]`` in ``order``; returns ``(pcm, offset table)``."""
+    silence = np.zeros(int(round(gap * rate)), dtype=np.float32)
+    parts = []
+    table = {}
+    position = 0
+    for path in order:
+        samples = decoded[path]
+        table[path] = {"start": round(position / rate, 6),
+                       "duration": round(len(samples) / rate, 6)}
+        parts += [samples, silence]
+        position += len(samples) + len(silence)
+    pcm = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    return pcm, table
+
+
+def encode(pcm, out_path, bitrate, rate=DECODE_RATE):
+    run_ffmpeg(["-f", "f32le", "-ar", str(rate), "-ac", "1", "-i", "-",
+                "-c:a", "libmp3lame", "-b:a", bitrate, "-f", "mp3"],
+               out_path, input_bytes=pcm.astype("<f4").tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--game", type=parse_game, action="append",
+                        help="game to pack (default: all known games)")
+    parser.add_argument("--out", default=OUT_DIR, help="output directory")
+    parser.add_argument("--bitrate", default=BITRATE)
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the asset cache and rebuild every sprite")
+    args = parser.parse_args()
+
+    games = dict(args.game or GAMES.items())
+    library = library_samples()
+    os.makedirs(args.out, exist_ok=True)
+
+    cache = AssetCache()
+    plans = {}
+    for game, instruments in games.items():
+        missing = [i for i in instruments if i not in library]
+        if missing:
+            print(f"Warning: {game}: no library samples for {', '.join(missing)}")
+        order = []
+        for path in (p for i in instruments for p in library.get(i, [])):
+            if os.path.exists(os.path.join(PUBLIC_AUDIO, *path.split("/"))):
+                order.append(path)
+            else:
+                print(f"Warning: {game}: missing {path}")
+        sources = [os.path.join(PUBLIC_AUDIO, *p.split("/")) for p in order]
+        key = cache.key(__file__, *sources, order=order, gap=GAP, bitrate=args.bitrate,
+                        out=os.path.abspath(args.out))
+        if args.force or not cache.fresh(key):
+            plans[game] = (order, key)
+        else:
+            print(f"{game}: up to date")
+
+    needed = sorted({p for order, _ in plans.values() for p in order})
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        decoded = dict(zip(needed, pool.map(
+            decode_audio, [os.path.join(PUBLIC_AUDIO, *p.split("/")) for p in needed])))
+
+    for game, (order, key) in plans.items():
+        pcm, table = pack(decoded, order)
+        audio_path = os.path.join(args.out, f"{game}.mp3")
+        table_path = os.path.join(args.out, f"{game}.json")
+        encode(pcm, audio_path, args.bitrate)
+        write_json(table_path, {"file": f"{URL_ROOT}/{game}.mp3", "sampleRate": DECODE_RATE,
+                                "sprites": table}, indent=1)
+        cache.record(key, [audio_path, table_path])
+        print(f"{game}: {len(order)} samples, {len(pcm) / DECODE_RATE:.1f}s, "
+              f"{os.path.getsize(audio_path) / 1e6:.2f} MB -> {audio_path}")
+    cache.save()
+
+
+if __name__ == "__main__":
+    main()
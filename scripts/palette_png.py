@@ -0,0 +1,62 @@
+"""Palette-indexed PNG output for flat-colour art.
+
+Pixel sprites, atlases and most flat overlays use a few dozen colours but
+were written as 32-bit RGBA.  ``quantize`` finds the exact colour table of
+an RGBA array in one vectorized pass (pixels packed to uint32, then
+``np.unique``); when there are at most 256 colours the image is written as
+an 8-bit (or smaller) palette PNG with a tRNS chunk carrying the per-entry
+alpha, which decodes to the same RGBA pixels.  Anything with more colours
+is written as RGBA unchanged.
+
+Fully transparent pixels are folded into a single ``(0, 0, 0, 0)`` entry,
+since their colour is never visible.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+MAX_COLORS = 256
+PROBE_STRIDE = 8    # cheap subsampled check before the full-image np.unique
+
+
+def quantize(rgba, max_colors=MAX_COLORS):
+    """Exact ``(indices uint8 H×W, palette N×4)`` of ``rgba``, or None if it has too many colours.
+
+    Palette entries are sorted by alpha, so every translucent entry comes
+    before the opaque ones and the tRNS chunk stays short.
+    """
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    # Alpha is the high byte when packed, so sorted colours are ordered by alpha.
+    packed = (rgba[..., 0].astype(np.uint32) | rgba[..., 1].astype(np.uint32) << 8 |
+              rgba[..., 2].astype(np.uint32) << 16 | rgba[..., 3].astype(np.uint32) << 24)
+    packed[rgba[..., 3] == 0] = 0
+    if len(np.unique(packed[::PROBE_STRIDE, ::PROBE_STRIDE])) > max_colors:
+        return None
+    colors, indices = np.unique(packed, return_inverse=True)
+    if len(colors) > max_colors:
+        return None
+    palette = np.stack([(colors >> shift) & 0xFF for shift in (0, 8, 16, 24)],
+                       axis=1).astype(np.uint8)
+    return indices.reshape(packed.shape).astype(np.uint8), palette
+
+
+def indexed_image(indices, palette):
+    """A mode "P" image of ``indices`` into the N×4 RGBA ``palette``."""
+    img = Image.fromarray(np.ascontiguousarray(indices, dtype=np.uint8), "P")
+    img.putpalette(np.ascontiguousarray(palette[:, :3], dtype=np.uint8).tobytes())
+    translucent = np.flatnonzero(palette[:, 3] < 255)
+    if len(translucent):
+        img.info["transparency"] = palette[:translucent[-1] + 1, 3].tobytes()
+    return img
+
+
+def encode_indexed(rgba):
+    """Palette PNG bytes for an RGBA array, or None if it has too many colours."""
+    quantized = quantize(rgba)
+    if quantized is None:
+        return None
+    buf = io.BytesIO()
+    indexed_image(*quantized).save(buf, "PNG", optimize=True)
+    return buf.getvalue()
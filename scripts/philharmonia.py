@@ -0,0 +1,278 @@
+"""Shared helpers for the Philharmonia sample corpus tools.
+
+Samples live under ``client/public/audio/philharmonia/<family>/<instrument>/``
+and are named ``instrument_pitch_duration_dynamic_articulation.mp3``, e.g.
+``violin_C5_05_forte_arco-normal.mp3``.  Unpitched percussion leaves the
+pitch empty (``snare-drum__025_forte_with-snares.mp3``) and a few tuned
+percussion files only carry ``instrument_pitch_dynamic``.  The timpani
+hits put the dynamic before the duration (``timpani_C2_forte_hits_normal``).
+
+The corpus manifest written by index_philharmonia.py is read and written
+here so every tool shares one format.  It is generated, not committed;
+rebuild it with index_philharmonia.py, then re-run the analysis tools whose
+columns the games need (trim_philharmonia.py, loudness_philharmonia.py,
+verify_pitch_philharmonia.py) and build_sample_lookup.py.
+"""
+
+from dataclasses import dataclass
+import json
+import os
+import re
+import struct
+import subprocess
+import tempfile
+
+import numpy as np
+
+from asset_cache import atomic_write, write_json
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+AUDIO_DIR = os.path.join(ROOT, "client", "public", "audio", "philharmonia")
+MANIFEST_PATH = os.path.join(AUDIO_DIR, "manifest.json")
+URL_ROOT = "/audio/philharmonia"
+FFMPEG = os.environ.get("FFMPEG", "ffmpeg")
+DECODE_RATE = 44100
+CHUNK_SAMPLES = 1 << 16
+
+UNPITCHED = "unpitched"
+NOTE_RE = re.compile(r"^([A-G])(s?)(-?\d)$")
+NOTE_NAMES = ["C", "Cs", "D", "Ds", "E", "F", "Fs", "G", "Gs", "A", "As", "B"]
+
+# Note lengths in filenames: "025" = 1/4 beat, "05" = 1/2, "1", "15" = 1.5,
+# plus the descriptive "long", "very-long" and "phrase".
+DURATION_BEATS = {"025": 0.25, "05": 0.5, "1": 1.0, "15": 1.5}
+DYNAMICS = ("molto-pianissimo", "pianissimo", "piano", "mezzo-piano", "mezzo-forte",
+            "forte", "fortissimo", "crescendo", "decrescendo", "cresc-decresc")
+
+
+@dataclass
+class SampleName:
+    instrument: str
+    pitch: str            # "C5", "As3" or UNPITCHED
+    duration: str         # raw duration code, "" when absent
+    dynamic: str
+    articulation: str     # "" when absent
+
+
+def parse_sample_name(filename):
+    """Split a sample filename into its fields, or None if it does not fit."""
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    if ext.lower() != ".mp3":
+        return None
+    parts = stem.split("_")
+    if len(parts) == 5:
+        instrument, pitch, duration, dynamic, articulation = parts
+        if duration in DYNAMICS and dynamic not in DYNAMICS:
+            # timpani_C2_forte_hits_normal puts the dynamic first
+            duration, dynamic = dynamic, duration
+    elif len(parts) == 3:
+        instrument, pitch, dynamic = parts
+        duration = articulation = ""
+    else:
+        return None
+    if pitch and not NOTE_RE.match(pitch):
+        return None
+    return SampleName(instrument, pitch or UNPITCHED, duration, dynamic, articulation)
+
+
+def note_to_midi(note):
+    """``"C4"`` -> 60, ``"As3"`` -> 58; None for UNPITCHED."""
+    m = NOTE_RE.match(note)
+    if not m:
+        return None
+    letter, sharp, octave = m.groups()
+    return NOTE_NAMES.index(letter + sharp) + 12 * (int(octave) + 1)
+
+
+def midi_to_note(midi):
+    return f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}"
+
+
+def midi_to_hz(midi):
+    return 440.0 * 2 ** ((midi - 69) / 12)
+
+
+def sample_paths(audio_dir=AUDIO_DIR):
+    """Every ``.mp3`` under ``audio_dir``, sorted for stable output."""
+    paths = []
+    for root, _, files in os.walk(audio_dir):
+        paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(".mp3"))
+    return sorted(paths)
+
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def set_column(manifest, field, values):
+    """Set ``field`` on every sample row from ``values`` (relative path -> value).
+
+    The field is appended to ``fields`` the first time; rows missing from
+    ``values`` keep their old value (None for a new field).
+    """
+    fields = manifest["fields"]
+    if field not in fields:
+        fields.append(field)
+        for row in manifest["samples"]:
+            row.append(None)
+    col = fields.index(field)
+    path_col = fields.index("path")
+    for row in manifest["samples"]:
+        if row[path_col] in values:
+            row[col] = values[row[path_col]]
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    write_json(path, manifest, separators=(",", ":"))
+
+
+def stream_audio(path, sample_rate=DECODE_RATE, channels=1, seconds=None,
+                 chunk=CHUNK_SAMPLES):
+    """Decode ``path`` with ffmpeg, yielding float32 PCM ``chunk`` frames at a time.
+
+    Every chunk but the last holds exactly ``chunk`` frames, shaped ``(n,)``
+    for mono or ``(n, channels)``; at most one chunk is held in memory.
+    ``seconds`` stops decoding after that much audio.  Raises RuntimeError
+    with ffmpeg's message if decoding fails.
+    """
+    cmd = [FFMPEG, "-v", "error", "-nostdin", "-i", path]
+    if seconds is not None:
+        cmd += ["-t", str(seconds)]
+    cmd += ["-f", "f32le", "-acodec", "pcm_f32le", "-ar", str(sample_rate),
+            "-ac", str(channels), "-"]
+    frame_bytes = 4 * channels
+    # stderr goes to a file: a damaged file can log more than a pipe holds
+    # while we are still blocked reading stdout.
+    with tempfile.TemporaryFile() as errors, \
+            subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors) as proc:
+        while True:
+            data = proc.stdout.read(chunk * frame_bytes)
+            if not data:
+                break
+            samples = np.frombuffer(data[:len(data) // frame_bytes * frame_bytes], dtype="<f4")
+            yield samples if channels == 1 else samples.reshape(-1, channels)
+        if proc.wait() != 0:
+            errors.seek(0)
+            message = "\n".join(errors.read().decode(errors="replace").strip().splitlines()[-20:])
+            raise RuntimeError(f"ffmpeg failed on {path}: {message}")
+
+
+def decode_audio(path, sample_rate=DECODE_RATE, channels=1, seconds=None):
+    """Decode a whole file (or its first ``seconds``) to float32 PCM in [-1, 1].
+
+    Shape is ``(n,)`` for mono, else ``(n, channels)``.
+    """
+    chunks = list(stream_audio(path, sample_rate, channels, seconds))
+    if not chunks:
+        return np.zeros((0,) if channels == 1 else (0, channels), dtype=np.float32)
+    return np.concatenate(chunks)
+
+
+def run_ffmpeg(args, out_path, input_bytes=None):
+    """Run ffmpeg writing to a temp file beside ``out_path``, then rename it in.
+
+    ``args`` must name the output format (``-f``) since the temp file's
+    extension does not.  ``input_bytes`` is fed to ffmpeg's stdin (``-i -``).
+    """
+    def encode(tmp):
+        proc = subprocess.run([FFMPEG, "-v", "error", "-y", *args, tmp], input=input_bytes,
+                              stdin=None if input_bytes else subprocess.DEVNULL,
+                              capture_output=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed for {out_path}: {proc.stderr.decode().strip()}")
+    atomic_write(out_path, encode)
+
+
+# ── MP3 header probing ──────────────────────────────────────────────────────
+# Enough of the MPEG audio frame header to read duration, sample rate and
+# bitrate without decoding: the first frame header, plus the Xing/Info or
+# VBRI frame count when present.
+
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000),
+                     0: (11025, 12000, 8000)}
+# kbps by (MPEG-1?, layer) and bitrate index
+MPEG_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+PROBE_BYTES = 1 << 16
+
+
+def _id3v2_size(head):
+    if head[:3] != b"ID3" or len(head) < 10:
+        return 0
+    size = 0
+    for b in head[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def probe_mp3(path):
+    """Return ``{seconds, sampleRate, bitrate, channels, bytes}`` for an MP3.
+
+    ``bitrate`` is in kbps (the average for VBR files).  Raises ValueError
+    if no MPEG audio frame is found.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        start = _id3v2_size(head)
+        f.seek(start)
+        data = f.read(PROBE_BYTES)
+        f.seek(max(size - 128, 0))
+        tail = f.read(128)
+    end = size - 128 if tail[:3] == b"TAG" else size
+
+    for i in range(len(data) - 4):
+        if data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+            continue
+        header, = struct.unpack(">I", data[i:i + 4])
+        version = (header >> 19) & 3
+        layer = 4 - ((header >> 17) & 3)
+        bitrate_idx = (header >> 12) & 0xF
+        rate_idx = (header >> 10) & 3
+        if version == 1 or layer == 4 or bitrate_idx in (0, 15) or rate_idx == 3:
+            continue
+        mpeg1 = version == 3
+        sample_rate = MPEG_SAMPLE_RATES[version][rate_idx]
+        bitrate = MPEG_BITRATES[(mpeg1, layer)][bitrate_idx]
+        mono = (header >> 6) & 3 == 3
+        if layer == 1:
+            spf = 384
+        elif layer == 2 or mpeg1:
+            spf = 1152
+        else:
+            spf = 576
+        break
+    else:
+        raise ValueError(f"No MPEG audio frame in {path}")
+
+    frames = None
+    side = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = i + 4 + side
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags, = struct.unpack(">I", data[xing + 4:xing + 8])
+        if flags & 1:
+            frames, = struct.unpack(">I", data[xing + 8:xing + 12])
+    elif data[i + 36:i + 40] == b"VBRI":
+        frames, = struct.unpack(">I", data[i + 50:i + 54])
+
+    audio_bytes = end - start - i
+    if frames:
+        seconds = frames * spf / sample_rate
+        bitrate = round(audio_bytes * 8 / seconds / 1000) if seconds else bitrate
+    else:
+        seconds = audio_bytes * 8 / (bitrate * 1000)
+    return {
+        "seconds": round(seconds, 4),
+        "sampleRate": sample_rate,
+        "bitrate": bitrate,
+        "channels": 1 if mono else 2,
+        "bytes": size,
+    }
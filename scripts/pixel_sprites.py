@@ -0,0 +1,145 @@
+"""Load and render declarative pixel-art sprite files.
+
+A sprite file is JSON with a named palette and an ordered list of layers.
+Each layer paints one palette colour over half-open row spans:
+
+    {
+      "name": "skeleton",
+      "grid": 64,
+      "palette": {"BK": "#1a1008", "BW": "#f5f0e8"},
+      "layers": [
+        {"color": "BK", "spans": [[3, 26, 38], [4, 26, 27]]},
+        {"color": "BW", "spans": [[4, 27, 37]]}
+      ]
+    }
+
+A span ``[y, x0, x1]`` fills logical pixels ``x0 <= x < x1`` on row ``y``.
+Later layers paint over earlier ones.  Palette entries are ``#rrggbb`` or
+``#rrggbbaa``; palette index 0 is always transparent.
+"""
+
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from palette_png import indexed_image, quantize
+
+SPRITE_DIR = os.path.join(os.path.dirname(__file__), "sprites")
+
+
+def parse_color(value):
+    """Parse a ``#rrggbb`` / ``#rrggbbaa`` string into an RGBA tuple."""
+    h = value.lstrip("#")
+    if len(h) == 6:
+        h += "ff"
+    if len(h) != 8:
+        raise ValueError(f"Bad colour {value!r}")
+    return tuple(int(h[i:i + 2], 16) for i in range(0, 8, 2))
+
+
+def load_sprite(path):
+    with open(path) as f:
+        spec = json.load(f)
+    spec.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return spec
+
+
+def sprite_paths(sprite_dir=SPRITE_DIR):
+    return sorted(
+        os.path.join(sprite_dir, f)
+        for f in os.listdir(sprite_dir) if f.endswith(".json")
+    )
+
+
+def rasterize(spec):
+    """Paint a sprite spec into (palette-index grid, RGBA palette array)."""
+    names = list(spec["palette"])
+    palette = np.zeros((len(names) + 1, 4), dtype=np.uint8)
+    for i, name in enumerate(names, start=1):
+        palette[i] = parse_color(spec["palette"][name])
+    index = {name: i for i, name in enumerate(names, start=1)}
+
+    grid_size = spec.get("grid", 64)
+    grid = np.zeros((grid_size, grid_size), dtype=np.uint8)
+    for layer in spec["layers"]:
+        color = index[layer["color"]]
+        for y, x0, x1 in layer["spans"]:
+            grid[y, x0:x1] = color
+    return grid, palette
+
+
+def render(grid, palette, scale):
+    """Expand a palette-index grid into a scale× upscaled RGBA image."""
+    rgba = palette[grid]
+    rgba = rgba.repeat(scale, axis=0).repeat(scale, axis=1)
+    return Image.fromarray(rgba, "RGBA")
+
+
+def render_indexed(grid, palette, scale):
+    """Like ``render`` but as a palette image using the sprite's own palette."""
+    return indexed_image(grid.repeat(scale, axis=0).repeat(scale, axis=1), palette)
+
+
+def pack_shelves(sizes, max_width, padding=1):
+    """Place (w, h) rectangles on horizontal shelves, tallest first.
+
+    Returns ``(positions, (width, height))`` where ``positions[i]`` is the
+    top-left corner of ``sizes[i]``.  Every rectangle is surrounded by
+    ``padding`` empty pixels so filtered sampling never bleeds between frames.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    x = y = padding
+    shelf_h = 0
+    width = 0
+    for i in order:
+        w, h = sizes[i]
+        if x > padding and x + w + padding > max_width:
+            x = padding
+            y += shelf_h + padding
+            shelf_h = 0
+        positions[i] = (x, y)
+        x += w + padding
+        shelf_h = max(shelf_h, h)
+        width = max(width, x)
+    return positions, (width, y + shelf_h + padding)
+
+
+def build_atlas(frames, scale, max_width=1024, image_name="atlas.png", indexed=False):
+    """Pack 1× RGBA frames into one scale× atlas image plus a frame index.
+
+    ``frames`` is a list of ``(name, rgba)`` pairs at logical resolution.
+    Packing happens at 1×, so the atlas is upscaled once like a sprite.  The
+    index uses the TexturePacker "hash" layout understood by most loaders.
+    With ``indexed`` the atlas is a palette image when the frames share at
+    most 256 colours (quantized at 1×, before upscaling); its meta format
+    is then "INDEXED8" rather than "RGBA8888".
+    """
+    sizes = [(rgba.shape[1], rgba.shape[0]) for _, rgba in frames]
+    positions, (w, h) = pack_shelves(sizes, max(1, max_width // scale))
+    sheet = np.zeros((h, w, 4), dtype=np.uint8)
+    index = {}
+    for (name, rgba), (x, y), (fw, fh) in zip(frames, positions, sizes):
+        sheet[y:y + fh, x:x + fw] = rgba
+        index[name] = {
+            "frame": {"x": x * scale, "y": y * scale,
+                      "w": fw * scale, "h": fh * scale},
+            "rotated": False,
+            "trimmed": False,
+            "sourceSize": {"w": fw * scale, "h": fh * scale},
+        }
+    quantized = quantize(sheet) if indexed else None
+    meta = {
+        "image": image_name,
+        "format": "RGBA8888" if quantized is None else "INDEXED8",
+        "size": {"w": w * scale, "h": h * scale},
+        "scale": str(scale),
+    }
+    if quantized is not None:
+        indices, palette = quantized
+        image = indexed_image(indices.repeat(scale, axis=0).repeat(scale, axis=1), palette)
+    else:
+        image = Image.fromarray(sheet.repeat(scale, axis=0).repeat(scale, axis=1), "RGBA")
+    return image, {"frames": index, "meta": meta}
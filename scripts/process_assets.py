@@ -4,7 +4,11 @@ import numpy as np
 import pytesseract
 import os
 
-image_path = "/Users/cnowlin/.cursor/projects/Users-cnowlin-Developer-Musically-Nowlin-Games/assets/Gemini_Generated_Image_6n21zi6n21zi6n21-d0bfe0f8-34f1-405f-b1e2-82cbf75f916b.png"
+from asset_cache import atomic_write, sha256_file, write_bytes
+from crop_manifest import MANIFEST_NAME, CropManifest, CropRecord
+from sprite_slicer import group_rows, sheet_arg
+
+image_path = sheet_arg("/Users/cnowlin/.cursor/projects/Users-cnowlin-Developer-Musically-Nowlin-Games/assets/Gemini_Generated_Image_6n21zi6n21zi6n21-d0bfe0f8-34f1-405f-b1e2-82cbf75f916b.png")
 output_dir = "sliced_assets"
 
 if not os.path.exists(output_dir):
@@ -82,6 +86,10 @@ while boxes:
 
 boxes = merged_boxes
 print(f"Found {len(boxes)} objects")
+cells = {box: (r, c) for r, row in enumerate(group_rows(boxes)) for c, box in enumerate(row)}
+
+manifest = CropManifest(source=image_path, sheet_sha256=sha256_file(image_path),
+                        width=img.shape[1], height=img.shape[0])
 
 for i, (x, y, w, h) in enumerate(boxes):
     roi_bgr = img_bgr[y:y+h, x:x+w]
@@ -116,11 +124,18 @@ for i, (x, y, w, h) in enumerate(boxes):
         
     print(f"Object {i}: {filename} (from '{text}')")
     
-    b, g, r = cv2.split(roi_bgr)
-    alpha = roi_mask.copy()
-    rgba = cv2.merge([b, g, r, alpha])
+    rgba = np.dstack((roi_bgr, roi_mask))
     
     save_path = os.path.join(output_dir, filename)
-    cv2.imwrite(save_path, rgba)
+    ok, png = cv2.imencode(".png", rgba)
+    if not ok:
+        raise OSError(f"Could not encode {save_path}")
+    atomic_write(save_path, lambda tmp: write_bytes(tmp, png))
+    # OCR names are unreliable; name crops with crop_manifest.py --reference ...
+    row, col = cells[(x, y, w, h)]
+    manifest.crops.append(CropRecord(file=filename, x=x, y=y, w=w, h=h,
+                                     area=cv2.countNonZero(roi_mask), row=row, col=col,
+                                     sha256=sha256_file(save_path)))
 
+manifest.save(os.path.join(output_dir, MANIFEST_NAME))
 print("Done processing")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Slice many sprite sheets concurrently with sprite_slicer.
+
+Each input may be a sheet file, a directory (searched recursively for
+images) or a glob pattern.  Sheets are sliced on a process pool
+(corpus_scan.scan) with at most ``--max-pending`` sheets in flight, so only that many decoded sheets
+are ever resident at once.  Every sheet gets its own output directory
+holding its crops and a ``manifest.json`` of crop boxes in row order.
+Sheets whose bytes, parameters and outputs are unchanged since the last run
+are skipped via the asset cache (``--force`` re-slices everything).
+
+With ``--reference`` the crops of all sheets are matched against the given
+named reference images and each manifest records the semantic name of its
+crops (see crop_manifest.py).
+
+Every crop is trimmed to the bounding box of its non-transparent pixels
+(searching ``--trim-margin`` pixels beyond the component box for soft
+edges) and given ``--pad`` transparent pixels on each side; the manifest
+records where the trimmed image sits relative to the component box.
+
+``--falloff N`` replaces the hard background mask with an anti-aliased
+matte whose alpha ramps up over N levels of colour distance (see
+sprite_slicer.soft_matte).  The ramp is limited to ``--band`` pixels
+inside each shape's edge so solid art stays opaque; ``--band 0`` lets
+glow and particle sheets be translucent throughout.
+
+``--tile N`` slices very large sheets out of core: the decoded sheet is
+memory-mapped and masked, labelled and stitched N×N pixels at a time (see
+tiled_slicer.py), giving the same crops in a fixed memory budget.
+
+Usage:
+    python3 scripts/slice_sheets.py generated_sheets/ --out sliced_assets
+    python3 scripts/slice_sheets.py "art/**/*.png" --jobs 8 --min-area 500
+    python3 scripts/slice_sheets.py sheets/ --reference "client/public/aoc/stage/*.png"
+"""
+
+import argparse
+import glob
+import os
+
+import crop_manifest
+import crop_match
+import palette_png
+import sprite_slicer
+import tiled_slicer
+from asset_cache import AssetCache
+from corpus_scan import scan
+from crop_manifest import MANIFEST_NAME, CropManifest, CropRecord, assign_names
+from sprite_slicer import (BG_TOLERANCE, MATTE_BAND, group_rows, load_sheet, trim_box,
+                           write_crops)
+from tiled_slicer import load_sheet_tiled
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def expand_inputs(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(os.path.join(root, f) for f in files
+                             if f.lower().endswith(IMAGE_EXTS))
+        elif glob.has_magic(item):
+            paths.extend(p for p in glob.glob(item, recursive=True)
+                         if p.lower().endswith(IMAGE_EXTS))
+        else:
+            paths.append(item)
+    return sorted(set(paths))
+
+
+def sheet_out_dirs(paths, out_dir):
+    """Map each sheet to ``out_dir/<stem>``, suffixing repeated stems."""
+    seen = {}
+    dirs = {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        n = seen.get(stem, 0)
+        seen[stem] = n + 1
+        dirs[path] = os.path.join(out_dir, stem if n == 0 else f"{stem}_{n}")
+    return dirs
+
+
+def slice_one(path, out_dir, sheet_sha256, min_area, min_height, tolerance,
+              pad=0, trim_margin=0, falloff=0, tile=0, band=MATTE_BAND):
+    if tile:
+        sheet = load_sheet_tiled(path, min_area=min_area, min_height=min_height,
+                                 tolerance=tolerance, falloff=falloff, band=band,
+                                 tile=tile)
+    else:
+        sheet = load_sheet(path, min_area=min_area, min_height=min_height,
+                           tolerance=tolerance, falloff=falloff, band=band)
+    rows = group_rows(sheet.boxes)
+    cells = [(r, c, box) for r, row in enumerate(rows) for c, box in enumerate(row)]
+    crops = [(trim_box(sheet.alpha, box, pad, trim_margin), f"crop_r{r:02d}_c{c:02d}.png")
+             for r, c, box in cells]
+    written = write_crops(sheet, crops, out_dir, jobs=1)
+    records = []
+    for (r, c, box), (image, rel), (_, digest) in zip(cells, crops, written):
+        x, y, w, h, area = box
+        ix, iy, iw, ih = image
+        records.append(CropRecord(file=rel, x=x, y=y, w=w, h=h, area=area,
+                                  row=r, col=c, sha256=digest,
+                                  trim_x=ix - x, trim_y=iy - y, trim_w=iw, trim_h=ih))
+    manifest = CropManifest(
+        source=path,
+        sheet_sha256=sheet_sha256,
+        width=int(sheet.rgba.shape[1]),
+        height=int(sheet.rgba.shape[0]),
+        crops=records,
+    )
+    manifest.save(os.path.join(out_dir, MANIFEST_NAME))
+    return path, len(crops), len(rows), [p for p, _ in written]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="sheet files, directories or globs")
+    parser.add_argument("--out", default="sliced_assets", help="output root directory")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="sheets in flight at once (default: 2 × jobs)")
+    parser.add_argument("--min-area", type=int, default=500)
+    parser.add_argument("--min-height", type=int, default=0)
+    parser.add_argument("--tolerance", type=int, default=BG_TOLERANCE,
+                        help="background colour tolerance per channel")
+    parser.add_argument("--falloff", type=int, default=0,
+                        help="soft matte falloff in colour levels (0: hard mask)")
+    parser.add_argument("--band", type=int, default=MATTE_BAND,
+                        help="soft matte edge band in pixels (0: translucent throughout)")
+    parser.add_argument("--tile", type=int, default=0,
+                        help="process sheets in N×N tiles from a memmap (0: in memory)")
+    parser.add_argument("--pad", type=int, default=0,
+                        help="transparent pixels around each trimmed crop")
+    parser.add_argument("--trim-margin", type=int, default=0,
+                        help="pixels beyond each component box searched for soft edges")
+    parser.add_argument("--reference", action="append", default=[],
+                        help="named reference images (files, directories or globs)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the asset cache and re-slice every sheet")
+    args = parser.parse_args()
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no sheets found")
+    out_dirs = sheet_out_dirs(paths, args.out)
+
+    references = expand_inputs(args.reference)
+    cache = AssetCache()
+    keys = {}
+    for path in paths:
+        keys[path] = cache.key(path, __file__, sprite_slicer.__file__, tiled_slicer.__file__,
+                               palette_png.__file__, crop_manifest.__file__,
+                               crop_match.__file__, *references, out_dir=os.path.abspath(out_dirs[path]),
+                               min_area=args.min_area, min_height=args.min_height,
+                               tolerance=args.tolerance, pad=args.pad,
+                               trim_margin=args.trim_margin, falloff=args.falloff,
+                               band=args.band)
+    stale = [p for p in paths if args.force or not cache.fresh(keys[p])]
+    if len(stale) < len(paths):
+        print(f"{len(paths) - len(stale)} sheets up to date")
+
+    failed = 0
+    sliced = {}
+    items = [(p, out_dirs[p], cache.digest(p)) for p in stale]
+    # Recycle workers so one huge sheet's heap never lingers in the pool.
+    for (path, *_), result, error in scan(slice_one, items, args.min_area, args.min_height,
+                                          args.tolerance, args.pad, args.trim_margin,
+                                          args.falloff, args.tile, args.band, jobs=args.jobs,
+                                          max_pending=args.max_pending,
+                                          max_tasks_per_child=8):
+        if error is not None:
+            failed += 1
+            print(f"Error: {path}: {error}")
+            continue
+        _, n_crops, n_rows, outputs = result
+        sliced[path] = outputs
+        print(f"Sliced {path}: {n_crops} crops in {n_rows} rows")
+
+    # Names are assigned across every sheet at once so each reference is
+    # used by at most one crop; the manifests are final only after this.
+    manifest_paths = {p: os.path.join(out_dirs[p], MANIFEST_NAME) for p in paths}
+    if sliced and references:
+        manifests = [CropManifest.load(m) for m in manifest_paths.values()
+                     if os.path.exists(m)]
+        named = assign_names(manifests, references)
+        for m in manifests:
+            m.save()
+        print(f"Named {named} crops from {len(references)} references")
+    for path, outputs in sliced.items():
+        cache.record(keys[path], outputs + [manifest_paths[path]])
+    cache.save()
+    print(f"Done: {len(paths) - failed}/{len(paths)} sheets")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
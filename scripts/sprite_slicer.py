@@ -0,0 +1,276 @@
+"""Single-pass sprite-sheet slicer shared by the extract scripts.
+
+A generated sheet is loaded once; the background mask, the RGBA copy and
+the connected components are each computed once, and every crop is written
+from that one in-memory sheet.  Component bounding boxes are taken from the
+hole-filled mask, which makes them identical to the ``cv2.RETR_EXTERNAL``
+contour boxes the old scripts used (a shape nested inside another shape's
+hole is part of the outer crop, not a crop of its own).
+
+``soft_matte`` is the anti-aliased alternative to the hard background mask:
+alpha ramps up over a colour-distance falloff and the background colour is
+unmixed from the semi-transparent edge pixels.
+
+Crops with at most 256 colours (flat overlays, particles) are written as
+exact palette PNGs via palette_png; the rest as RGBA.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import hashlib
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from asset_cache import atomic_write, write_bytes
+from palette_png import encode_indexed
+
+BG_TOLERANCE = 20
+OPEN_KERNEL = 3
+MATTE_FALLOFF = 48
+MATTE_BAND = 1          # pixels inside the hard-mask edge where alpha may ramp
+
+
+@dataclass
+class Sheet:
+    path: str
+    rgba: np.ndarray
+    alpha: np.ndarray
+    boxes: list = field(default_factory=list)   # (x, y, w, h, area)
+
+
+def sheet_arg(default):
+    """Sheet path for the one-off extract/analyze/process scripts.
+
+    Each was written against one hard-coded source image; a path given as
+    the first command-line argument overrides it.
+    """
+    return sys.argv[1] if len(sys.argv) > 1 else default
+
+
+def load_image(path):
+    img = cv2.imread(path)
+    if img is None:
+        raise FileNotFoundError(f"Could not load image at {path}")
+    return img
+
+
+def background_mask(img, bg_color=None, tolerance=BG_TOLERANCE, open_kernel=OPEN_KERNEL):
+    """Alpha mask: 0 where a pixel is within ``tolerance`` of the background."""
+    if bg_color is None:
+        bg_color = img[0, 0]
+    bg = np.asarray(bg_color, dtype=np.int16)
+    lower = np.clip(bg - tolerance, 0, 255).astype(np.uint8)
+    upper = np.clip(bg + tolerance, 0, 255).astype(np.uint8)
+    alpha = cv2.bitwise_not(cv2.inRange(img, lower, upper))
+    if open_kernel:
+        kernel = np.ones((open_kernel, open_kernel), np.uint8)
+        alpha = cv2.morphologyEx(alpha, cv2.MORPH_OPEN, kernel)
+    return alpha
+
+
+def soft_matte(img, bg_color=None, tolerance=BG_TOLERANCE, falloff=MATTE_FALLOFF,
+               open_kernel=OPEN_KERNEL, band=MATTE_BAND, decontaminate=True):
+    """8-bit alpha from each pixel's distance to the background colour.
+
+    The distance is the largest per-channel difference.  Pixels within
+    ``tolerance`` of the background get alpha 0; beyond it alpha is
+    proportional to the distance, reaching 255 at ``tolerance + falloff``,
+    so with ``falloff=0`` the matte equals ``background_mask``.  The ramp
+    only applies within ``band`` pixels of the hard mask's edge: deeper
+    pixels are opaque, so solid art close to the background colour stays
+    solid.  ``band=0`` ramps everywhere, for glows and haze that are
+    translucent throughout.  Unless ``decontaminate`` is false, edge pixels
+    are then unmixed in place in ``img`` (see ``unmix_background``).  The
+    opening removes isolated specks from the matte's support only, leaving
+    soft edges intact.
+    """
+    if bg_color is None:
+        bg_color = img[0, 0]
+    bg = np.clip(np.asarray(bg_color, dtype=np.int16), 0, 255)
+    diff = cv2.absdiff(img, tuple(float(v) for v in bg) + (0.0,))
+    dist = cv2.max(cv2.max(diff[:, :, 0], diff[:, :, 1]), diff[:, :, 2])
+    del diff
+    levels = np.arange(256)
+    lut = np.where(levels > tolerance,
+                   np.minimum(levels * 255 // (tolerance + falloff or 1), 255), 0)
+    alpha = cv2.LUT(dist, lut.astype(np.uint8))
+    if open_kernel:
+        kernel = np.ones((open_kernel, open_kernel), np.uint8)
+        alpha[cv2.morphologyEx(alpha, cv2.MORPH_OPEN, kernel) == 0] = 0
+    if band:
+        kernel = np.ones((2 * band + 1, 2 * band + 1), np.uint8)
+        alpha[cv2.erode(alpha, kernel) > 0] = 255
+    if decontaminate:
+        unmix_background(img, alpha, bg)
+    return alpha
+
+
+def unmix_background(img, alpha, bg_color):
+    """Remove the background colour from semi-transparent pixels of ``img`` in place.
+
+    Each edge pixel (0 < alpha < 255) is taken as ``alpha * fg + (1 - alpha)
+    * bg`` and replaced by ``fg``, so no halo of the background survives
+    compositing.
+    """
+    bg = np.asarray(bg_color, dtype=np.int16)
+    ys, xs = np.nonzero((alpha > 0) & (alpha < 255))
+    a = alpha[ys, xs, None] / 255.0
+    unmixed = bg + (img[ys, xs] - bg) / a
+    img[ys, xs] = np.clip(unmixed, 0, 255).round().astype(np.uint8)
+
+
+def fill_holes(mask):
+    """Set every background pixel not 4-connected to the border to 255."""
+    _, binary = cv2.threshold(mask, 0, 255, cv2.THRESH_BINARY)
+    # A 1px frame of background joins every border-touching region to (0, 0).
+    padded = cv2.copyMakeBorder(binary, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    cv2.floodFill(padded, None, (0, 0), 128, flags=4)
+    return cv2.compare(padded[1:-1, 1:-1], 128, cv2.CMP_NE)
+
+
+def contour_area(alpha, box):
+    """``cv2.contourArea`` of the outer contour of the shape boxed by ``box``."""
+    x, y, w, h = box[:4]
+    roi = np.ascontiguousarray(alpha[y:y + h, x:x + w])
+    contours, _ = cv2.findContours(roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return max((cv2.contourArea(c) for c in contours
+                if cv2.boundingRect(c) == (0, 0, w, h)), default=0.0)
+
+
+def component_boxes(alpha, min_area=0, min_height=0):
+    """Bounding boxes ``(x, y, w, h, area)`` of the outer shapes in ``alpha``.
+
+    ``area`` is the hole-filled pixel count, but ``min_area`` is compared
+    with the outer contour's ``cv2.contourArea`` (always smaller), as the
+    RETR_EXTERNAL scripts this replaces did.
+    """
+    _, _, stats, _ = cv2.connectedComponentsWithStats(
+        fill_holes(alpha), connectivity=8)
+    stats = stats[1:]  # drop the background component
+    keep = (stats[:, cv2.CC_STAT_AREA] > min_area) & \
+           (stats[:, cv2.CC_STAT_HEIGHT] > min_height)
+    boxes = [tuple(int(v) for v in s) for s in stats[keep]]
+    if min_area:
+        boxes = [b for b in boxes if contour_area(alpha, b) > min_area]
+    return boxes
+
+
+def load_sheet(path, min_area=0, min_height=0, falloff=0, band=MATTE_BAND, **mask_args):
+    """Load, mask and box a sheet.
+
+    With ``falloff`` the alpha is a ``soft_matte`` with that falloff and
+    ``band`` instead of the hard mask.  Only the BGRA sheet outlives this call:
+    ``Sheet.alpha`` is a view of its alpha channel, and crops are cut as
+    views into it (palette crops take one RGBA copy for quantizing).
+    """
+    img = load_image(path)
+    if falloff:
+        alpha = soft_matte(img, falloff=falloff, band=band, **mask_args)
+    else:
+        alpha = background_mask(img, **mask_args)
+    rgba = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    del img
+    rgba[:, :, 3] = alpha
+    boxes = component_boxes(alpha, min_area, min_height)
+    boxes.sort(key=lambda b: b[1])
+    return Sheet(path, rgba, rgba[:, :, 3], boxes)
+
+
+def soften_boxes(sheet, boxes, falloff=MATTE_FALLOFF, band=0, **mask_args):
+    """Re-matte ``boxes`` of a hard-masked sheet in place with ``soft_matte``.
+
+    For sheets that mix solid art with glows or particles: load with the
+    hard mask, then soften only the translucent assets.  The background
+    colour is taken from the sheet's corner, as ``load_sheet`` does.
+    """
+    mask_args.setdefault("bg_color", sheet.rgba[0, 0, :3].copy())
+    for box in boxes:
+        x, y, w, h = box[:4]
+        region = sheet.rgba[y:y + h, x:x + w]
+        bgr = np.ascontiguousarray(region[:, :, :3])
+        region[:, :, 3] = soft_matte(bgr, falloff=falloff, band=band, **mask_args)
+        region[:, :, :3] = bgr
+
+
+def group_rows(boxes, threshold=None):
+    """Group y-sorted boxes into rows, each sorted left to right.
+
+    With a fixed ``threshold`` a box starts a new row when it lies more than
+    ``threshold`` pixels below the first box of the current row.  Without
+    one, the cut-off is half the tallest box seen in the current row.
+    """
+    rows = []
+    current = []
+    row_y = row_h = 0
+    for box in sorted(boxes, key=lambda b: b[1]):
+        y, h = box[1], box[3]
+        limit = threshold if threshold is not None else row_h * 0.5
+        if current and y > row_y + limit:
+            rows.append(sorted(current, key=lambda b: b[0]))
+            current = []
+        if not current:
+            row_y, row_h = y, h
+        current.append(box)
+        row_h = max(row_h, h)
+    if current:
+        rows.append(sorted(current, key=lambda b: b[0]))
+    return rows
+
+
+def trim_box(alpha, box, pad=0, margin=0):
+    """Tight box around the non-transparent pixels near ``box``, grown by ``pad``.
+
+    The search window is ``box`` grown by ``margin`` pixels (clamped to the
+    sheet), which recovers soft edges the mask left outside the component;
+    keep it below half the gap between sprites.  Every side of the result
+    gets exactly ``pad`` transparent pixels, so it may extend past the sheet
+    (``write_crop`` fills that with transparency).  Returns ``(x, y, w, h)``.
+    """
+    x, y, w, h = box[:4]
+    x0, y0 = max(x - margin, 0), max(y - margin, 0)
+    x1, y1 = min(x + w + margin, alpha.shape[1]), min(y + h + margin, alpha.shape[0])
+    solid = alpha[y0:y1, x0:x1] > 0
+    cols = np.flatnonzero(solid.any(axis=0))
+    rows = np.flatnonzero(solid.any(axis=1))
+    if len(rows):
+        x, y = x0 + int(cols[0]), y0 + int(rows[0])
+        w, h = int(cols[-1] - cols[0]) + 1, int(rows[-1] - rows[0]) + 1
+    return x - pad, y - pad, w + 2 * pad, h + 2 * pad
+
+
+def write_crop(sheet, box, path, indexed=True):
+    """Encode one crop to ``path``; returns ``(path, sha256 of the PNG)``.
+
+    Parts of ``box`` outside the sheet are written as transparent pixels.
+    """
+    x, y, w, h = box[:4]
+    height, width = sheet.rgba.shape[:2]
+    crop = sheet.rgba[max(y, 0):y + h, max(x, 0):x + w]
+    if crop.shape[:2] != (h, w):
+        crop = cv2.copyMakeBorder(crop, max(-y, 0), max(y + h - height, 0),
+                                  max(-x, 0), max(x + w - width, 0),
+                                  cv2.BORDER_CONSTANT, value=0)
+    png = encode_indexed(cv2.cvtColor(crop, cv2.COLOR_BGRA2RGBA)) if indexed else None
+    if png is None:
+        ok, png = cv2.imencode(".png", crop)
+        if not ok:
+            raise OSError(f"Could not encode {path}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    atomic_write(path, lambda tmp: write_bytes(tmp, png))
+    return path, hashlib.sha256(png).hexdigest()
+
+
+def write_crops(sheet, crops, base_dir, jobs=None, indexed=True):
+    """Write ``(box, rel_path)`` crops under ``base_dir`` in one pass.
+
+    PNG encoding releases the GIL, so crops are encoded on a thread pool
+    straight from the shared in-memory sheet.  Returns ``(path, sha256)``
+    for each crop, in order.
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(write_crop, sheet, box, os.path.join(base_dir, rel), indexed)
+                   for box, rel in crops]
+        return [f.result() for f in futures]
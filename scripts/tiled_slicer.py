@@ -0,0 +1,247 @@
+"""Tiled, out-of-core variant of sprite_slicer.load_sheet for very large sheets.
+
+``load_sheet`` keeps the decoded sheet, its mask, the BGRA copy, the
+hole-filled mask and a label image in memory together, over 10 bytes per
+pixel.  ``load_sheet_tiled`` decodes the sheet once, spills it into a
+disk-backed memmap and does everything after that one TILE×TILE tile at a
+time:
+
+1. The mask (hard, or a soft matte) is computed per tile with a halo of
+   ``open_kernel`` (plus the matte's ``band``) pixels, so the opening and
+   erosion are exact at tile edges, and
+   written into the alpha channel of the memmapped BGRA sheet.
+2. Per tile, soft-matte edges are unmixed (a per-pixel step that needs no
+   halo) and connected components are labelled: foreground 8-connected,
+   background 4-connected, as in ``fill_holes``.  Labels are stitched
+   across tile seams with union-find.  Background components that never
+   reach the sheet border are holes; merging each hole with the foreground
+   around it reproduces ``fill_holes``, so the boxes are exactly those of
+   ``sprite_slicer.component_boxes``.
+
+After the decode, memory is bounded by the tile size plus the per-component
+tables.  The decode itself is not: OpenCV and Pillow both decode a PNG in
+one call, so peak memory is still one full BGR copy (3 bytes per pixel),
+freed before tiling starts.
+Crops are then written straight from the memmap.
+"""
+
+import tempfile
+
+import cv2
+import numpy as np
+
+from sprite_slicer import (BG_TOLERANCE, MATTE_BAND, OPEN_KERNEL, Sheet, background_mask,
+                           contour_area, load_image, soft_matte, unmix_background)
+
+TILE = 2048
+
+
+class _Labels:
+    """Union-find over global component ids with per-component stats."""
+
+    def __init__(self):
+        self.parent = []
+        self.stats = []     # per tile: (n, 5) array of x0, y0, x1, y1, area
+
+    def add(self, stats, x0, y0):
+        """Register one tile's components; returns the id offset of its labels."""
+        offset = len(self.parent)
+        self.parent.extend(range(offset, offset + len(stats)))
+        s = stats.astype(np.int64)
+        self.stats.append(np.stack([
+            s[:, cv2.CC_STAT_LEFT] + x0, s[:, cv2.CC_STAT_TOP] + y0,
+            s[:, cv2.CC_STAT_LEFT] + s[:, cv2.CC_STAT_WIDTH] + x0,
+            s[:, cv2.CC_STAT_TOP] + s[:, cv2.CC_STAT_HEIGHT] + y0,
+            s[:, cv2.CC_STAT_AREA]], axis=1))
+        return offset
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union_pairs(self, pairs):
+        for a, b in pairs:
+            ra, rb = self.find(a), self.find(b)
+            if ra != rb:
+                self.parent[ra] = rb
+
+    def roots(self):
+        return np.array([self.find(i) for i in range(len(self.parent))], dtype=np.int64)
+
+    def table(self):
+        return np.concatenate(self.stats) if self.stats else np.zeros((0, 5), np.int64)
+
+
+def _global(labels, offset):
+    """Tile labels (0 = none) as global ids, -1 where unlabelled."""
+    return np.where(labels > 0, labels.astype(np.int64) + (offset - 1), -1)
+
+
+def _pairs(a, b):
+    """Unique ``(a, b)`` id pairs where both sides are labelled."""
+    keep = (a >= 0) & (b >= 0)
+    packed = np.unique((a[keep] << 32) | b[keep])
+    return np.stack([packed >> 32, packed & 0xFFFFFFFF], axis=1).tolist()
+
+
+def _label(mask, connectivity):
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=connectivity)
+    return labels, stats[1:]
+
+
+def spill_to_memmap(path):
+    """Decode ``path`` and move it into an anonymous disk-backed BGRA memmap (alpha 0).
+
+    The whole image is decoded first; that copy is freed on return.
+    """
+    img = load_image(path)
+    rgba = np.memmap(tempfile.TemporaryFile(), dtype=np.uint8, mode="w+",
+                     shape=(img.shape[0], img.shape[1], 4))
+    for y in range(0, img.shape[0], TILE):
+        rgba[y:y + TILE, :, :3] = img[y:y + TILE]
+    return rgba
+
+
+def tiles(height, width, tile):
+    for y0 in range(0, height, tile):
+        for x0 in range(0, width, tile):
+            yield y0, x0, min(y0 + tile, height), min(x0 + tile, width)
+
+
+def matte_tiles(rgba, tile=TILE, falloff=0, bg_color=None, tolerance=BG_TOLERANCE,
+                open_kernel=OPEN_KERNEL, band=MATTE_BAND):
+    """Fill ``rgba``'s alpha channel tile by tile (colours are left untouched)."""
+    height, width = rgba.shape[:2]
+    halo = (open_kernel or 0) + (band if falloff else 0)
+    for y0, x0, y1, x1 in tiles(height, width, tile):
+        ya, xa = max(y0 - halo, 0), max(x0 - halo, 0)
+        window = np.ascontiguousarray(rgba[ya:min(y1 + halo, height),
+                                           xa:min(x1 + halo, width), :3])
+        if falloff:
+            alpha = soft_matte(window, bg_color, tolerance, falloff, open_kernel, band,
+                               decontaminate=False)
+        else:
+            alpha = background_mask(window, bg_color, tolerance, open_kernel)
+        rgba[y0:y1, x0:x1, 3] = alpha[y0 - ya:y1 - ya, x0 - xa:x1 - xa]
+
+
+def tiled_component_boxes(rgba, tile=TILE, min_area=0, min_height=0, unmix_bg=None):
+    """``component_boxes`` of ``rgba``'s alpha, computed tile by tile.
+
+    With ``unmix_bg`` each tile's colours are also unmixed from that
+    background colour on the way (see ``unmix_background``).
+    """
+    height, width = rgba.shape[:2]
+    fg, bg = _Labels(), _Labels()
+    # Last row of the previous tile row, and of the tile row in progress.
+    above_fg = np.full(width, -1, np.int64)
+    above_bg = np.full(width, -1, np.int64)
+    below_fg = above_fg.copy()
+    below_bg = above_bg.copy()
+    fg_pairs, bg_pairs, hole_pairs = [], [], []   # hole_pairs: (bg id, fg id)
+    border = []
+
+    for y0, x0, y1, x1 in tiles(height, width, tile):
+        if unmix_bg is not None:
+            block = np.array(rgba[y0:y1, x0:x1])
+            unmix_background(block[:, :, :3], block[:, :, 3], unmix_bg)
+            rgba[y0:y1, x0:x1] = block
+            solid = block[:, :, 3] > 0
+        else:
+            solid = rgba[y0:y1, x0:x1, 3] > 0
+        fg_labels, fg_stats = _label(solid.view(np.uint8), 8)
+        bg_labels, bg_stats = _label((~solid).view(np.uint8), 4)
+        f = _global(fg_labels, fg.add(fg_stats, x0, y0))
+        b = _global(bg_labels, bg.add(bg_stats, x0, y0))
+        del fg_labels, bg_labels, solid
+
+        # Background components on the sheet border are background proper.
+        for edge, on_border in ((b[0], y0 == 0), (b[-1], y1 == height),
+                                (b[:, 0], x0 == 0), (b[:, -1], x1 == width)):
+            if on_border:
+                border.extend(np.unique(edge[edge >= 0]).tolist())
+
+        # Hole candidates: background 4-adjacent to foreground inside the tile.
+        hole_pairs += _pairs(b[:, :-1], f[:, 1:]) + _pairs(b[:, 1:], f[:, :-1])
+        hole_pairs += _pairs(b[:-1], f[1:]) + _pairs(b[1:], f[:-1])
+
+        # Top seam against the last row of the tile row above.
+        if y0 > 0:
+            top_f, top_b = f[0], b[0]
+            lo, hi = max(x0, 1), min(x1, width - 1)
+            fg_pairs += _pairs(above_fg[x0:x1], top_f)
+            fg_pairs += _pairs(above_fg[lo - 1:x1 - 1], top_f[lo - x0:])
+            fg_pairs += _pairs(above_fg[x0 + 1:hi + 1], top_f[:hi - x0])
+            bg_pairs += _pairs(above_bg[x0:x1], top_b)
+            hole_pairs += _pairs(above_bg[x0:x1], top_f) + _pairs(top_b, above_fg[x0:x1])
+        # Left seam against the last column of the tile to the left.
+        if x0 > 0:
+            left_f, left_b = f[:, 0], b[:, 0]
+            fg_pairs += _pairs(prev_f, left_f)
+            fg_pairs += _pairs(prev_f[:-1], left_f[1:]) + _pairs(prev_f[1:], left_f[:-1])
+            bg_pairs += _pairs(prev_b, left_b)
+            hole_pairs += _pairs(prev_b, left_f) + _pairs(left_b, prev_f)
+        prev_f, prev_b = f[:, -1].copy(), b[:, -1].copy()
+        below_fg[x0:x1], below_bg[x0:x1] = f[-1], b[-1]
+        if x1 == width:
+            above_fg, below_fg = below_fg, above_fg
+            above_bg, below_bg = below_bg, above_bg
+        del f, b
+
+    fg.union_pairs(fg_pairs)
+    bg.union_pairs(bg_pairs)
+    bg_roots = bg.roots()
+    bg_area = np.bincount(bg_roots, weights=bg.table()[:, 4], minlength=len(bg_roots))
+    is_hole = np.ones(len(bg_roots), bool)
+    is_hole[bg_roots[border]] = False
+
+    # Merge each hole with all the foreground around it, and count its area once.
+    hole_owner = {}
+    extra = {}
+    for b_id, f_id in hole_pairs:
+        root = int(bg_roots[b_id])
+        if not is_hole[root]:
+            continue
+        if root not in hole_owner:
+            hole_owner[root] = f_id
+            extra[f_id] = extra.get(f_id, 0) + int(bg_area[root])
+        else:
+            fg.union_pairs([(hole_owner[root], f_id)])
+    roots = fg.roots()
+    stats = fg.table()
+    n = len(roots)
+    x0 = np.full(n, width, np.int64)
+    y0 = np.full(n, height, np.int64)
+    x1 = np.zeros(n, np.int64)
+    y1 = np.zeros(n, np.int64)
+    np.minimum.at(x0, roots, stats[:, 0])
+    np.minimum.at(y0, roots, stats[:, 1])
+    np.maximum.at(x1, roots, stats[:, 2])
+    np.maximum.at(y1, roots, stats[:, 3])
+    area = np.bincount(roots, weights=stats[:, 4], minlength=n)
+    for f_id, hole_area in extra.items():
+        area[roots[f_id]] += hole_area
+
+    keep = np.unique(roots)
+    keep = keep[(area[keep] > min_area) & (y1[keep] - y0[keep] > min_height)]
+    boxes = [(int(x0[i]), int(y0[i]), int(x1[i] - x0[i]), int(y1[i] - y0[i]), int(area[i]))
+             for i in keep]
+    if min_area:
+        boxes = [b for b in boxes if contour_area(rgba[:, :, 3], b) > min_area]
+    boxes.sort(key=lambda b: (b[1], b[0]))
+    return boxes
+
+
+def load_sheet_tiled(path, min_area=0, min_height=0, falloff=0, tile=TILE, **mask_args):
+    """``sprite_slicer.load_sheet`` in bounded memory; ``Sheet.rgba`` is a memmap."""
+    rgba = spill_to_memmap(path)
+    bg_color = mask_args.pop("bg_color", None)
+    if bg_color is None:
+        bg_color = np.array(rgba[0, 0, :3])
+    matte_tiles(rgba, tile, falloff, bg_color, **mask_args)
+    boxes = tiled_component_boxes(rgba, tile, min_area, min_height,
+                                  unmix_bg=bg_color if falloff else None)
+    return Sheet(path, rgba, rgba[:, :, 3], boxes)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Re-encode the Philharmonia corpus to low-bitrate Opus with an MP3 fallback.
+
+Every MP3 under client/public/audio/philharmonia is transcoded with ffmpeg
+on a process pool into a mirrored tree (default
+client/public/audio/philharmonia-opus):
+
+    strings/violin/violin_C5_05_forte_arco-normal.opus   libopus, --opus-bitrate
+    strings/violin/violin_C5_05_forte_arco-normal.mp3    libmp3lame, --mp3-bitrate
+
+The MP3 copy is the fallback for browsers without Opus decoding (older
+Safari).  Finished files are recorded in the asset cache as they complete,
+so an interrupted run picks up where it stopped.  Unless ``--no-quality``
+is given, each output is decoded again and compared with the source (SNR in
+dB after aligning codec delay).
+
+A report is written to ``<out>/transcode-report.json``:
+
+    {"params": {...}, "totals": {"files", "sourceBytes", "opusBytes", "mp3Bytes", ...},
+     "files": [{"path", "sourceBytes", "opusBytes", "opusSnrDb", "mp3Bytes", "mp3SnrDb"}, ...]}
+
+Usage:
+    python3 scripts/transcode_philharmonia.py
+    python3 scripts/transcode_philharmonia.py --opus-bitrate 32k --no-mp3 --jobs 4
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from asset_cache import AssetCache
+from corpus_scan import scan
+from philharmonia import AUDIO_DIR, ROOT, decode_audio, run_ffmpeg, sample_paths
+
+OUT_DIR = os.path.join(ROOT, "client", "public", "audio", "philharmonia-opus")
+REPORT_NAME = "transcode-report.json"
+OPUS_BITRATE = "48k"
+MP3_BITRATE = "64k"
+MAX_LAG = 4096          # samples of codec delay searched when aligning for SNR
+SAVE_EVERY = 200        # completed files between cache checkpoints
+
+
+def encode_args(src, codec, bitrate):
+    if codec == "opus":
+        return ["-i", src, "-map_metadata", "-1", "-c:a", "libopus", "-b:a", bitrate,
+                "-vbr", "on", "-application", "audio", "-f", "ogg"]
+    return ["-i", src, "-map_metadata", "-1", "-c:a", "libmp3lame", "-b:a", bitrate,
+            "-f", "mp3"]
+
+
+def snr_db(ref, test, max_lag=MAX_LAG):
+    """SNR of ``test`` against ``ref`` after shifting out up to ``max_lag`` samples of delay."""
+    n = min(len(ref), len(test))
+    if n == 0:
+        return None
+    ref, test = ref[:n], test[:n]
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    corr = np.fft.irfft(np.fft.rfft(ref, size) * np.conj(np.fft.rfft(test, size)), size)
+    lag_range = min(max_lag, n - 1)
+    lags = np.r_[0:lag_range + 1, -lag_range:0]
+    lag = int(lags[np.argmax(corr[lags])])
+    if lag > 0:
+        ref, test = ref[lag:], test[:n - lag]
+    elif lag < 0:
+        ref, test = ref[:n + lag], test[-lag:]
+    noise = float(np.sum((ref - test) ** 2, dtype=np.float64))
+    signal = float(np.sum(ref ** 2, dtype=np.float64))
+    if signal == 0 or noise == 0:
+        return None
+    return round(10 * np.log10(signal / noise), 2)
+
+
+def transcode_file(src, rel, out_dir, codecs, measure):
+    """Encode ``src`` once per ``(codec, bitrate)``; returns ``(row, outputs)``."""
+    stem = os.path.join(out_dir, os.path.splitext(rel)[0])
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+    row = {"path": rel, "sourceBytes": os.path.getsize(src)}
+    outputs = []
+    ref = decode_audio(src) if measure else None
+    for codec, bitrate in codecs:
+        out = f"{stem}.{codec}"
+        run_ffmpeg(encode_args(src, codec, bitrate), out)
+        outputs.append(out)
+        row[f"{codec}Bytes"] = os.path.getsize(out)
+        if measure:
+            row[f"{codec}SnrDb"] = snr_db(ref, decode_audio(out))
+    return row, outputs
+
+
+def totals(rows, codecs):
+    source = sum(r["sourceBytes"] for r in rows)
+    result = {"files": len(rows), "sourceBytes": source}
+    for codec, _ in codecs:
+        size = sum(r.get(f"{codec}Bytes", 0) for r in rows)
+        result[f"{codec}Bytes"] = size
+        result[f"{codec}Ratio"] = round(size / source, 4) if source else None
+        snrs = [r[f"{codec}SnrDb"] for r in rows if r.get(f"{codec}SnrDb") is not None]
+        if snrs:
+            result[f"{codec}SnrDbMin"] = min(snrs)
+            result[f"{codec}SnrDbMedian"] = round(float(np.median(snrs)), 2)
+    return result
+
+
+def load_report(path):
+    try:
+        with open(path) as f:
+            return {r["path"]: r for r in json.load(f)["files"]}
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio-dir", default=AUDIO_DIR, help="corpus root")
+    parser.add_argument("--out", default=OUT_DIR, help="output root directory")
+    parser.add_argument("--opus-bitrate", default=OPUS_BITRATE)
+    parser.add_argument("--mp3-bitrate", default=MP3_BITRATE)
+    parser.add_argument("--no-mp3", action="store_true", help="skip the MP3 fallback")
+    parser.add_argument("--no-quality", action="store_true",
+                        help="skip decoding outputs to measure SNR")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the asset cache and re-encode every file")
+    args = parser.parse_args()
+
+    codecs = [("opus", args.opus_bitrate)]
+    if not args.no_mp3:
+        codecs.append(("mp3", args.mp3_bitrate))
+    measure = not args.no_quality
+    params = {"codecs": codecs, "quality": measure, "out": os.path.abspath(args.out)}
+
+    paths = sample_paths(args.audio_dir)
+    rels = {p: os.path.relpath(p, args.audio_dir).replace(os.sep, "/") for p in paths}
+    report_path = os.path.join(args.out, REPORT_NAME)
+    previous = load_report(report_path)
+
+    cache = AssetCache()
+    keys = {p: cache.key(p, __file__, **params) for p in paths}
+    rows = {}
+    for p in paths:
+        if args.force or not cache.fresh(keys[p]):
+            continue
+        # A run interrupted before writing its report still left the
+        # outputs recorded; their sizes are enough to resume from.
+        rows[p] = previous.get(rels[p]) or {
+            "path": rels[p], "sourceBytes": os.path.getsize(p),
+            **{f"{os.path.splitext(o)[1][1:]}Bytes": os.path.getsize(o)
+               for o in cache.outputs(keys[p])}}
+    stale = [p for p in paths if p not in rows]
+    if rows:
+        print(f"{len(rows)} files up to date")
+
+    failed = 0
+    done_count = 0
+    for (path, _), result, error in scan(transcode_file, [(p, rels[p]) for p in stale],
+                                         args.out, codecs, measure, jobs=args.jobs):
+        if error is not None:
+            failed += 1
+            print(f"Error: {error}")
+            continue
+        row, outputs = result
+        rows[path] = row
+        cache.record(keys[path], outputs)
+        done_count += 1
+        if done_count % SAVE_EVERY == 0:
+            cache.save()
+            print(f"Transcoded {done_count}/{len(stale)}")
+    cache.save()
+
+    files = [rows[p] for p in paths if p in rows]
+    report = {"params": {"codecs": dict(codecs), "quality": measure},
+              "totals": totals(files, codecs), "files": files}
+    os.makedirs(args.out, exist_ok=True)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=1)
+        f.write("\n")
+
+    t = report["totals"]
+    for codec, bitrate in codecs:
+        print(f"{codec} @ {bitrate}: {t['sourceBytes'] / 1e6:.1f} MB -> "
+              f"{t[f'{codec}Bytes'] / 1e6:.1f} MB (x{t[f'{codec}Ratio']})")
+    print(f"Done: {len(files)}/{len(paths)} files -> {report_path}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Find (and optionally cut) leading silence and release tails in every sample.
+
+Each sample in the corpus manifest is streamed through ffmpeg to mono PCM
+on a process pool (see corpus_scan.py) and reduced to 256-sample peak and
+RMS envelopes in NumPy:
+
+    onset   first frame whose peak is within ``--onset-db`` of the file's peak
+    end     end of the last 256-sample frame whose RMS is above ``--tail-db``
+            below the peak RMS
+
+Both are stored as seconds in the manifest's ``onset`` and ``end`` columns,
+so the games can start playback at ``onset`` and stop at ``end``.  With
+``--write``, files that would lose more than ``--min-saving`` seconds are
+re-encoded in place, keeping a short pre-roll and fading out over the last
+frames.  Their manifest row then gets the new onset, end, seconds and
+bytes.  Finished files are checkpointed, so an interrupted run resumes.
+
+Run index_philharmonia.py first; re-indexing keeps these columns for
+unchanged files.
+
+Usage:
+    python3 scripts/trim_philharmonia.py
+    python3 scripts/trim_philharmonia.py --write --tail-db -50
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from asset_cache import sha256_file
+from corpus_scan import Checkpoint, checkpoint_path, scan
+from philharmonia import (AUDIO_DIR, DECODE_RATE, MANIFEST_PATH, load_manifest, probe_mp3,
+                          run_ffmpeg, save_manifest, set_column, stream_audio)
+
+FRAME = 256
+ONSET_DB = -40.0
+TAIL_DB = -60.0
+PRE_ROLL = 0.005        # seconds kept before the onset when rewriting
+FADE = 0.02             # seconds of fade-out ending at the tail
+MIN_SAVING = 0.05       # only rewrite files that get at least this much shorter
+
+
+def envelopes(chunks, frame=FRAME):
+    """Per-frame peak and RMS of streamed ``chunks``, plus the total sample count.
+
+    Chunks must hold a multiple of ``frame`` samples (all but the last), so
+    only the envelopes, 1/``frame`` of the audio, are ever kept.
+    """
+    peaks, rms = [], []
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        frames = np.pad(chunk, (0, -len(chunk) % frame)).reshape(-1, frame)
+        peaks.append(np.abs(frames).max(axis=1))
+        rms.append(np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1)))
+    if not peaks:
+        return np.zeros(0), np.zeros(0), 0
+    return np.concatenate(peaks), np.concatenate(rms), total
+
+
+def find_bounds(peaks, rms, total, onset_db=ONSET_DB, tail_db=TAIL_DB, frame=FRAME):
+    """``(onset, end)`` sample indices of the audible part, to ``frame`` precision."""
+    if len(peaks) == 0 or peaks.max() == 0:
+        return 0, 0
+    onset = int(np.argmax(peaks >= peaks.max() * 10 ** (onset_db / 20))) * frame
+    loud = np.flatnonzero(rms >= rms.max() * 10 ** (tail_db / 20))
+    end = min(int(loud[-1] + 1) * frame, total)
+    return onset, max(end, onset)
+
+
+def trim_args(src, start, end, bitrate):
+    fade_start = max(end - FADE, start)
+    return ["-i", src, "-af",
+            f"atrim=start={start:.4f}:end={end:.4f},asetpts=PTS-STARTPTS,"
+            f"afade=t=out:st={fade_start - start:.4f}:d={end - fade_start:.4f}",
+            "-c:a", "libmp3lame", "-b:a", f"{bitrate}k", "-f", "mp3"]
+
+
+def trim_file(path, onset_db, tail_db, write, min_saving):
+    """Measure ``path``; returns ``(onset, end, info or None)`` in seconds.
+
+    ``info`` is the new probe result when the file was rewritten.
+    """
+    peaks, rms, total = envelopes(stream_audio(path))
+    onset, end = find_bounds(peaks, rms, total, onset_db, tail_db)
+    onset, end, total = onset / DECODE_RATE, end / DECODE_RATE, total / DECODE_RATE
+    start = max(onset - PRE_ROLL, 0.0)
+    if not write or start + (total - end) < min_saving:
+        return round(onset, 4), round(end, 4), None
+    run_ffmpeg(trim_args(path, start, end, probe_mp3(path)["bitrate"]), path)
+    return round(onset - start, 4), round(end - start, 4), probe_mp3(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio-dir", default=AUDIO_DIR, help="corpus root")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="corpus manifest")
+    parser.add_argument("--onset-db", type=float, default=ONSET_DB,
+                        help="onset threshold relative to the peak sample")
+    parser.add_argument("--tail-db", type=float, default=TAIL_DB,
+                        help="tail threshold relative to the loudest frame")
+    parser.add_argument("--write", action="store_true",
+                        help="re-encode files with the silence cut off")
+    parser.add_argument("--min-saving", type=float, default=MIN_SAVING,
+                        help="seconds a file must lose before it is rewritten")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    fields = manifest["fields"]
+    rels = [row[fields.index("path")] for row in manifest["samples"]]
+    paths = [os.path.join(args.audio_dir, *rel.split("/")) for rel in rels]
+
+    rows = dict(zip(paths, zip(rels, manifest["samples"])))
+    params = {"tool": sha256_file(__file__), "onset_db": args.onset_db,
+              "tail_db": args.tail_db, "write": args.write, "min_saving": args.min_saving}
+
+    onsets, ends, seconds, sizes = {}, {}, {}, {}
+    failed = 0
+    saved = 0.0
+    with Checkpoint(checkpoint_path("trim_philharmonia"), params) as done:
+        for path, result, error in scan(trim_file, paths, args.onset_db, args.tail_db,
+                                        args.write, args.min_saving, jobs=args.jobs,
+                                        checkpoint=done):
+            if error is not None:
+                failed += 1
+                print(f"Error: {error}")
+                continue
+            onset, end, info = result
+            rel, row = rows[path]
+            onsets[rel], ends[rel] = onset, end
+            old_seconds = row[fields.index("seconds")]
+            if info is not None:
+                seconds[rel], sizes[rel] = info["seconds"], info["bytes"]
+                saved += old_seconds - info["seconds"]
+            else:
+                saved += onset + max(old_seconds - end, 0.0)
+
+    set_column(manifest, "onset", onsets)
+    set_column(manifest, "end", ends)
+    set_column(manifest, "seconds", seconds)
+    set_column(manifest, "bytes", sizes)
+    save_manifest(manifest, args.manifest)
+    verb = "Cut" if args.write else "Found"
+    print(f"{verb} {saved:.1f}s of silence across {len(onsets)} samples "
+          f"({len(seconds)} rewritten, {failed} failed) -> {args.manifest}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
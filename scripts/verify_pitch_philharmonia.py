@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Check every sample's measured fundamental against the pitch in its name.
+
+Each pitched sample in the corpus manifest is decoded on a process pool
+(checkpointed, see corpus_scan.py) and analysed with YIN: the difference
+function of all frames is computed at once from FFT cross-correlations and
+cumulative energies, then the first cumulative-mean-normalized dip below
+THRESHOLD gives each frame's period (with parabolic refinement).  The median over voiced frames, taken
+from just after the onset, is the sample's frequency.
+
+Results:
+
+* manifest columns ``frequency`` (Hz) and ``cents`` (deviation from the
+  named pitch at A4 = 440 Hz);
+* a report (default ``philharmonia-pitch.json``) of samples more than
+  ``--tolerance`` cents off, worst first, with octave errors marked;
+* with ``--update-library``, the ``frequency:`` values in
+  client/src/common/instruments/instrumentLibrary.ts replaced by the
+  measured ones for samples within tolerance; reported samples get the
+  nominal frequency of their named pitch and are left for manual review.
+
+Usage:
+    python3 scripts/verify_pitch_philharmonia.py
+    python3 scripts/verify_pitch_philharmonia.py --tolerance 30 --update-library
+"""
+
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+
+from asset_cache import atomic_write, sha256_file, write_bytes
+from corpus_scan import Checkpoint, checkpoint_path, scan
+from pack_audio_sprites import LIBRARY_PATH
+from philharmonia import (AUDIO_DIR, DECODE_RATE, MANIFEST_PATH, UNPITCHED, decode_audio,
+                          load_manifest, midi_to_hz, note_to_midi, parse_sample_name,
+                          save_manifest, set_column)
+
+WINDOW = 2048           # YIN integration window; frames are twice this long
+HOP = 512
+SKIP = 0.05             # seconds after the onset left out (attack transient)
+ANALYSIS_SECONDS = 0.6
+FMIN, FMAX = 25.0, 4500.0
+THRESHOLD = 0.15
+VOICED = 0.35           # frames whose best dip is above this are unvoiced
+TOLERANCE = 50.0        # cents
+
+
+def yin(samples, rate=DECODE_RATE, threshold=THRESHOLD, window=WINDOW, hop=HOP):
+    """Per-frame ``(f0 Hz, aperiodicity)`` arrays for ``samples``."""
+    size = 2 * window
+    if len(samples) < size:
+        samples = np.pad(samples, (0, size - len(samples)))
+    frames = np.lib.stride_tricks.sliding_window_view(samples, size)[::hop].astype(np.float64)
+
+    # d(tau) = sum_j (x_j - x_{j+tau})^2 over j < window, for all frames at once.
+    n_fft = 2 * size
+    corr = np.fft.irfft(np.conj(np.fft.rfft(frames[:, :window], n_fft)) *
+                        np.fft.rfft(frames, n_fft), n_fft)[:, :window + 1]
+    energy = np.concatenate((np.zeros((len(frames), 1)), np.cumsum(frames ** 2, axis=1)),
+                            axis=1)
+    taus = np.arange(window + 1)
+    shifted = energy[:, taus + window] - energy[:, taus]
+    diff = np.maximum(energy[:, [window]] + shifted - 2 * corr, 0)
+
+    cmndf = np.ones_like(diff)
+    running = np.cumsum(diff[:, 1:], axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cmndf[:, 1:] = np.where(running > 0, diff[:, 1:] * taus[1:] / running, 1.0)
+
+    lo = max(int(rate / FMAX), 2)
+    hi = min(int(rate / FMIN), window - 1)
+    search = cmndf[:, lo:hi]
+    below = search < threshold
+    tau = np.where(below.any(axis=1), below.argmax(axis=1), search.argmin(axis=1))
+    rows = np.arange(len(search))
+    # Walk down to the bottom of the dip the threshold crossing landed in.
+    for _ in range(hi - lo):
+        step = (tau + 1 < search.shape[1])
+        step[step] &= search[rows[step], tau[step] + 1] < search[rows[step], tau[step]]
+        if not step.any():
+            break
+        tau[step] += 1
+    tau = tau + lo
+
+    # Parabolic interpolation around the chosen lag.
+    a, b, c = cmndf[rows, tau - 1], cmndf[rows, tau], cmndf[rows, tau + 1]
+    denom = a - 2 * b + c
+    offset = np.where(np.abs(denom) > 1e-12, 0.5 * (a - c) / np.where(denom, denom, 1), 0.0)
+    period = tau + np.clip(offset, -1, 1)
+    return rate / period, b
+
+
+def measure_file(path, onset):
+    samples = decode_audio(path, seconds=onset + SKIP + ANALYSIS_SECONDS)
+    samples = samples[int((onset + SKIP) * DECODE_RATE):]
+    if len(samples) == 0 or not np.abs(samples).max():
+        return None
+    f0, aperiodicity = yin(samples)
+    voiced = f0[aperiodicity < VOICED]
+    return round(float(np.median(voiced)), 2) if len(voiced) else None
+
+
+def cents(measured, expected):
+    return 1200 * np.log2(measured / expected)
+
+
+LIBRARY_FREQUENCY_RE = re.compile(r"frequency: [\d.]+,([^{}]*?path: '([^']+)')")
+
+
+def update_library(frequencies, library_path=LIBRARY_PATH):
+    """Replace ``frequency:`` values in the library for samples in ``frequencies``."""
+    with open(library_path) as f:
+        text = f.read()
+    count = 0
+
+    def replace(m):
+        nonlocal count
+        hz = frequencies.get(m.group(2))
+        if hz is None:
+            return m.group(0)
+        count += 1
+        return f"frequency: {hz},{m.group(1)}"
+
+    text = LIBRARY_FREQUENCY_RE.sub(replace, text)
+    atomic_write(library_path, lambda tmp: write_bytes(tmp, text.encode()))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio-dir", default=AUDIO_DIR, help="corpus root")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="corpus manifest")
+    parser.add_argument("--report", default="philharmonia-pitch.json")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="cents of deviation before a sample is reported")
+    parser.add_argument("--update-library", action="store_true",
+                        help="write measured frequencies into instrumentLibrary.ts")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    fields = manifest["fields"]
+    path_col = fields.index("path")
+    onset_col = fields.index("onset") if "onset" in fields else None
+    rows = []
+    for row in manifest["samples"]:
+        name = parse_sample_name(row[path_col])
+        if name is not None and name.pitch != UNPITCHED:
+            onset = (row[onset_col] or 0.0) if onset_col is not None else 0.0
+            rows.append((row[path_col], name.pitch, onset))
+
+    items = {os.path.join(args.audio_dir, *rel.split("/")): (rel, pitch, onset)
+             for rel, pitch, onset in rows}
+    params = {"tool": sha256_file(__file__)}
+
+    measured = {}
+    failed = 0
+    with Checkpoint(checkpoint_path("verify_pitch_philharmonia"), params) as done:
+        for (path, _), hz, error in scan(measure_file,
+                                         [(p, onset) for p, (_, _, onset) in items.items()],
+                                         jobs=args.jobs, checkpoint=done):
+            if error is not None:
+                failed += 1
+                print(f"Error: {error}")
+            elif hz is not None:
+                rel, pitch, _ = items[path]
+                measured[rel] = (pitch, hz)
+
+    deviations = {}
+    report = []
+    library_hz = {}
+    for rel, (pitch, hz) in measured.items():
+        expected = midi_to_hz(note_to_midi(pitch))
+        off = round(float(cents(hz, expected)), 1)
+        deviations[rel] = off
+        library_hz[rel] = hz if abs(off) <= args.tolerance else round(expected, 2)
+        if abs(off) > args.tolerance:
+            octaves = round(off / 1200)
+            octave_error = octaves != 0 and abs(off - 1200 * octaves) <= args.tolerance
+            report.append({"path": rel, "pitch": pitch, "expectedHz": round(expected, 2),
+                           "measuredHz": hz, "cents": off, "octaveError": octave_error})
+    report.sort(key=lambda r: -abs(r["cents"]))
+
+    set_column(manifest, "frequency", {rel: hz for rel, (_, hz) in measured.items()})
+    set_column(manifest, "cents", deviations)
+    save_manifest(manifest, args.manifest)
+    with open(args.report, "w") as f:
+        json.dump({"tolerance": args.tolerance, "measured": len(measured),
+                   "deviations": report}, f, indent=1)
+        f.write("\n")
+    octave = sum(r["octaveError"] for r in report)
+    print(f"Measured {len(measured)}/{len(rows)} pitched samples: {len(report)} off by more "
+          f"than {args.tolerance:g} cents ({octave} octave errors) -> {args.report}")
+
+    if args.update_library:
+        root = manifest["root"].removeprefix("/audio/")
+        updated = update_library({f"{root}/{rel}": hz for rel, hz in library_hz.items()})
+        print(f"Updated {updated} frequencies in {LIBRARY_PATH} (reported samples "
+              f"set to their nominal pitch)")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()